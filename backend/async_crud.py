@@ -0,0 +1,96 @@
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from . import crud, models
+from .models import Product
+from .services.product_documents import product_document
+
+# Async versions of the crud functions the API serves from the event loop.
+# They run the same statements as crud (shared builders where there is more
+# than one line of query), only awaited on an AsyncSession.
+
+async def get_catalog_version(db: AsyncSession):
+    version = await db.scalar(
+        select(models.CatalogVersion.version).filter(models.CatalogVersion.id == crud.CATALOG_VERSION_ID)
+    )
+    return version or 0
+
+async def get_product(db: AsyncSession, product_id: int):
+    return await db.get(Product, product_id)
+
+async def get_product_documents(db: AsyncSession, products):
+    """{product_id: document bytes} for products, serializing any that have no stored document yet."""
+    products = list(products)
+    rows = await db.execute(
+        select(models.ProductDocument.product_id, models.ProductDocument.body)
+        .filter(models.ProductDocument.product_id.in_([product.id for product in products]))
+    )
+    documents = dict(rows.all())
+    for product in products:
+        if product.id not in documents:
+            documents[product.id] = product_document(product)
+    return documents
+
+async def get_product_document(db: AsyncSession, product_id: int):
+    """The stored API document of one product, or None if there is no such product."""
+    body = await db.scalar(
+        select(models.ProductDocument.body).filter(models.ProductDocument.product_id == product_id)
+    )
+    if body is not None:
+        return body
+    product = await get_product(db, product_id)
+    return product_document(product) if product else None
+
+async def list_products(db: AsyncSession, sort: str = 'id', descending: bool = False, limit: int = 15, after=None, skip: int = 0,
+                        min_price: float = None, max_price: float = None, min_listings: int = None, max_listings: int = None):
+    """See crud.list_products."""
+    products = []
+    for statement in crud.list_products_statements(sort, descending, after, skip, min_price, max_price, min_listings, max_listings):
+        if len(products) > limit:
+            break
+        products += (await db.scalars(statement.limit(limit + 1 - len(products)))).all()
+    return crud.product_page(products, limit, sort)
+
+async def search_index(db: AsyncSession):
+    # Cached by crud after the first lookup, which needs the sync inspector
+    return await db.run_sync(crud.search_index)
+
+async def search_products(db: AsyncSession, query: str, limit: int = 20, after=None, min_price: float = None, max_price: float = None, min_listings: int = None):
+    """See crud.search_products."""
+    tokens = crud.search_tokens(query)
+    if not tokens:
+        return [], None
+    statement = crud.search_statement(await search_index(db), tokens, limit, after, min_price, max_price, min_listings)
+    return crud.search_page((await db.execute(statement)).all(), limit)
+
+async def get_latest_last_updated(db: AsyncSession):
+    return await db.scalar(select(Product.last_updated).order_by(Product.last_updated.desc()).limit(1))
+
+async def get_user_by_username(db: AsyncSession, username: str):
+    return await db.scalar(select(models.User).filter(models.User.username == username))
+
+async def create_user(db: AsyncSession, username: str, hashed_password: str, plan: str = "free"):
+    db_user = models.User(username=username, hashed_password=hashed_password, plan=plan)
+    db.add(db_user)
+    await db.commit()
+    await db.refresh(db_user)
+    return db_user
+
+async def update_user_password_hash(db: AsyncSession, user_id: int, hashed_password: str):
+    """Store a re-hash of the same password, e.g. after the bcrypt cost changed."""
+    await db.execute(update(models.User).where(models.User.id == user_id).values(hashed_password=hashed_password))
+    await db.commit()
+
+async def update_user_subscription(db: AsyncSession, user_id: int, plan: str, start=None, end=None, stripe_subscription_id: str = None):
+    user = await db.get(models.User, user_id)
+    if user:
+        user.plan = plan
+        if start:
+            user.subscription_start = start
+        if end:
+            user.subscription_end = end
+        if stripe_subscription_id:
+            user.stripe_subscription_id = stripe_subscription_id
+        await db.commit()
+        await db.refresh(user)
+        return user
+    return None
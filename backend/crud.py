@@ -1,41 +1,672 @@
-from sqlalchemy.orm import Session
+from sqlalchemy import DateTime, Float, Integer, Numeric, and_, case, cast, func, insert, inspect, literal, or_, select, text, tuple_, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, aliased
 from . import models
 import json  # Import JSON for serialization
 from .models import Product
+from .services.product_documents import product_document
 import datetime  # Import datetime for subscription dates
+import math
+import re
+
+CATALOG_VERSION_ID = 1
+
+# Called after every committed product write made through this module in this process
+catalog_change_listeners = []
+
+def get_catalog_version(db: Session):
+    version = db.query(models.CatalogVersion.version).filter(models.CatalogVersion.id == CATALOG_VERSION_ID).scalar()
+    return version or 0
+
+def bump_catalog_version(db: Session):
+    """Count a product write in the current transaction, so every process's read cache sees it."""
+    result = db.execute(
+        update(models.CatalogVersion)
+        .where(models.CatalogVersion.id == CATALOG_VERSION_ID)
+        .values(version=models.CatalogVersion.version + 1)
+        .execution_options(synchronize_session=False)
+    )
+    if not result.rowcount:
+        db.add(models.CatalogVersion(id=CATALOG_VERSION_ID, version=1))
+
+def catalog_changed():
+    for listener in catalog_change_listeners:
+        listener()
+
+def write_product_documents(db: Session, products):
+    """Re-serialize the API documents of products (current ORM state) in the current transaction."""
+    products = list(products)
+    if not products:
+        return
+    db.query(models.ProductDocument).filter(
+        models.ProductDocument.product_id.in_([product.id for product in products])
+    ).delete(synchronize_session=False)
+    db.execute(insert(models.ProductDocument), [
+        {'product_id': product.id, 'body': product_document(product)} for product in products
+    ])
+
+def backfill_product_documents(db: Session, chunk_size: int = 500):
+    """Write documents for every product; used once when the table is new."""
+    last_id = 0
+    written = 0
+    while True:
+        chunk = db.query(Product).filter(Product.id > last_id).order_by(Product.id).limit(chunk_size).all()
+        if not chunk:
+            return written
+        write_product_documents(db, chunk)
+        db.commit()
+        written += len(chunk)
+        last_id = chunk[-1].id
+
+def get_product_documents(db: Session, products):
+    """{product_id: document bytes} for products, serializing any that have no stored document yet."""
+    products = list(products)
+    documents = dict(
+        db.query(models.ProductDocument.product_id, models.ProductDocument.body)
+        .filter(models.ProductDocument.product_id.in_([product.id for product in products]))
+        .all()
+    )
+    for product in products:
+        if product.id not in documents:
+            documents[product.id] = product_document(product)
+    return documents
+
+def get_product_document(db: Session, product_id: int):
+    """The stored API document of one product, or None if there is no such product."""
+    body = db.query(models.ProductDocument.body).filter(models.ProductDocument.product_id == product_id).scalar()
+    if body is not None:
+        return body
+    product = get_product(db, product_id)
+    return product_document(product) if product else None
 
 def create_product(db: Session, name: str, image_url: str):
     db_product = Product(name=name, image_url=image_url)
     db.add(db_product)
+    db.flush()
+    write_product_documents(db, [db_product])
+    bump_catalog_version(db)
     db.commit()
+    catalog_changed()
     db.refresh(db_product)
     return db_product
 
 def delete_product(db: Session, product_id: int):
     db_product = db.query(Product).filter(Product.id == product_id).first()
     if db_product:
+        # SQLite doesn't enforce the cascades unless foreign keys are switched on
+        for table in (models.ProductDocument, models.ProductKeyword, models.ProductObservation, models.ProductObservationDaily):
+            db.query(table).filter(table.product_id == product_id).delete(synchronize_session=False)
         db.delete(db_product)
+        bump_catalog_version(db)
         db.commit()
+        catalog_changed()
         return {"message": "Product deleted successfully"}
     return None
 
 def get_product(db: Session, product_id: int):
     return db.query(models.Product).filter(models.Product.id == product_id).first()
 
-def get_products(db: Session, skip: int = 0, limit: int = 10):
-    return db.query(Product).offset(skip).limit(limit).all()
+# Public sort keys of list_products; each has a (column, id) index on products
+PRODUCT_SORT_KEYS = {
+    'id': Product.id,
+    'name': Product.name,
+    'average_ebay_price': Product.average_ebay_price,
+    'ebay_listings': Product.ebay_listings,
+    'ebay_sale_amount': Product.ebay_sale_amount,
+    'search_volume_us': Product.search_volume_us_value,
+}
+
+def list_products_statements(sort: str = 'id', descending: bool = False, after=None, skip: int = 0,
+                             min_price: float = None, max_price: float = None, min_listings: int = None, max_listings: int = None):
+    """The selects list_products runs in turn, each to be limited to the rows still missing.
+
+    Shared with async_crud, which runs the same statements on an AsyncSession.
+    """
+    column = PRODUCT_SORT_KEYS[sort]
+    query = select(Product)
+    if min_price is not None:
+        query = query.filter(Product.average_ebay_price >= min_price)
+    if max_price is not None:
+        query = query.filter(Product.average_ebay_price <= max_price)
+    if min_listings is not None:
+        query = query.filter(Product.ebay_listings >= min_listings)
+    if max_listings is not None:
+        query = query.filter(Product.ebay_listings <= max_listings)
+
+    def ordered(query, *columns):
+        return query.order_by(*(c.desc() if descending else c for c in columns))
+
+    def beyond(left, right):
+        return left < right if descending else left > right
+
+    if skip:
+        return [ordered(query.order_by(column.is_(None)), column, Product.id).offset(skip)]
+    if column is Product.id:
+        if after is not None:
+            query = query.filter(beyond(Product.id, after[1]))
+        return [ordered(query, Product.id)]
+    # Non-null values first, then the nulls by id: two index-friendly queries
+    # instead of one ORDER BY that sorts nulls last on the fly
+    statements = []
+    if after is None or after[0] is not None:
+        valued = query.filter(column.isnot(None))
+        if after is not None:
+            valued = valued.filter(beyond(tuple_(column, Product.id), tuple_(*after)))
+        statements.append(ordered(valued, column, Product.id))
+    unvalued = query.filter(column.is_(None))
+    if after is not None and after[0] is None:
+        unvalued = unvalued.filter(beyond(Product.id, after[1]))
+    statements.append(ordered(unvalued, Product.id))
+    return statements
+
+def product_page(products, limit: int, sort: str):
+    """(products, last) from up to limit + 1 fetched products; last is None on the final page."""
+    if len(products) <= limit:
+        return products, None
+    products = products[:limit]
+    return products, (getattr(products[-1], PRODUCT_SORT_KEYS[sort].key), products[-1].id)
+
+def list_products(db: Session, sort: str = 'id', descending: bool = False, limit: int = 15, after=None, skip: int = 0,
+                  min_price: float = None, max_price: float = None, min_listings: int = None, max_listings: int = None):
+    """One page of products ordered by sort then id; products without a sort value come last.
+
+    after is the (sort value, id) of the previous page's last product, so
+    every page is a range scan on the (column, id) index however deep it is.
+    skip is the old offset paging, kept for existing clients.
+    Returns (products, last) where last is None on the final page.
+    """
+    products = []
+    for statement in list_products_statements(sort, descending, after, skip, min_price, max_price, min_listings, max_listings):
+        if len(products) > limit:
+            break
+        products += db.scalars(statement.limit(limit + 1 - len(products))).all()
+    return product_page(products, limit, sort)
+
+def with_sort_values(product_data: dict):
+    """product_data plus the numeric columns list_products sorts on."""
+    if 'search_volume_us' in product_data:
+        return {**product_data, 'search_volume_us_value': parse_search_volume(product_data['search_volume_us'])}
+    return product_data
+
+def price_volatility(previous, current) -> float:
+    """Relative price change between two scrapes, capped at 1."""
+    previous, current = previous or 0, current or 0
+    return min(1.0, abs(current - previous) / previous) if previous else 0.0
+
+def scrape_weight(search_volume, volatility: float = 0.0) -> float:
+    """The incremental scheduler's multiplier on a product's age, see services/scheduler.py."""
+    return (1 + math.log10(1 + max(0, search_volume or 0))) * (1 + volatility)
+
+def with_schedule_values(product_data: dict, previous_price, scraped_at: datetime.datetime):
+    """product_data plus the columns the incremental scheduler ranks products by."""
+    volatility = price_volatility(previous_price, product_data.get('average_ebay_price'))
+    return {
+        **product_data,
+        'last_scraped_at': scraped_at,
+        'scrape_weight': scrape_weight(parse_search_volume(product_data.get('search_volume_us')), volatility),
+    }
+
+def backfill_schedule_values(db: Session, chunk_size: int = 1000):
+    """Fill last_scraped_at and scrape_weight from the price history; used once when the columns are new."""
+    last_id = 0
+    filled = 0
+    while True:
+        chunk = (
+            db.query(Product.id, Product.last_updated, Product.search_volume_us)
+            .filter(Product.id > last_id)
+            .order_by(Product.id)
+            .limit(chunk_size)
+            .all()
+        )
+        if not chunk:
+            return filled
+        observations = get_recent_observations(db, [product_id for product_id, _, _ in chunk])
+        scraped_at, weights = {}, {}
+        for product_id, last_updated, search_volume_us in chunk:
+            recent = observations.get(product_id, [])
+            if recent:
+                scraped_at[product_id] = recent[0][0]
+            elif last_updated:
+                try:
+                    scraped_at[product_id] = datetime.datetime.fromisoformat(last_updated)
+                except ValueError:
+                    pass
+            volatility = price_volatility(recent[1][1], recent[0][1]) if len(recent) > 1 else 0.0
+            weights[product_id] = scrape_weight(parse_search_volume(search_volume_us), volatility)
+        values = {'scrape_weight': case(weights, value=Product.id, else_=None)}
+        if scraped_at:
+            values['last_scraped_at'] = case(scraped_at, value=Product.id, else_=None)
+        db.execute(
+            update(Product)
+            .where(Product.id.in_(list(weights)))
+            .values(values)
+            .execution_options(synchronize_session=False)
+        )
+        db.commit()
+        filled += len(chunk)
+        last_id = chunk[-1][0]
+
+def get_stalest_products(db: Session, limit: int, never_scraped_age_hours: float, now: datetime.datetime = None):
+    """(id, name) of the products with the highest age_hours * scrape_weight, highest first.
+
+    A single ORDER BY ... LIMIT over the products table, whatever the size
+    of the price history.
+    """
+    now = now or datetime.datetime.utcnow()
+    if db.bind.dialect.name == 'postgresql':
+        age_hours = func.extract('epoch', literal(now, DateTime) - Product.last_scraped_at) / 3600
+    else:
+        age_hours = (func.julianday(literal(now, DateTime)) - func.julianday(Product.last_scraped_at)) * 24
+    priority = func.coalesce(age_hours, never_scraped_age_hours) * func.coalesce(Product.scrape_weight, 1.0)
+    return db.query(Product.id, Product.name).order_by(priority.desc(), Product.id).limit(limit).all()
+
+def backfill_search_volume_values(db: Session, chunk_size: int = 1000):
+    """Fill search_volume_us_value for every product; used once when the column is new."""
+    last_id = 0
+    filled = 0
+    while True:
+        chunk = (
+            db.query(Product.id, Product.search_volume_us)
+            .filter(Product.id > last_id)
+            .order_by(Product.id)
+            .limit(chunk_size)
+            .all()
+        )
+        if not chunk:
+            return filled
+        db.execute(
+            update(Product)
+            .where(Product.id.in_([product_id for product_id, _ in chunk]))
+            .values(search_volume_us_value=case(
+                {product_id: parse_search_volume(value) for product_id, value in chunk},
+                value=Product.id,
+                else_=None,
+            ))
+            .execution_options(synchronize_session=False)
+        )
+        db.commit()
+        filled += len(chunk)
+        last_id = chunk[-1][0]
 
 def update_product(db: Session, product_id: int, product_data: dict):
     product = db.query(Product).filter(Product.id == product_id).first()
     if product:
-        for key, value in product_data.items():
+        for key, value in with_sort_values(product_data).items():
             setattr(product, key, value)
         db.add(product)
+        if 'popular_keywords' in product_data:
+            replace_product_keywords(db, {product_id: parse_popular_keywords(product_data['popular_keywords'])})
+        db.flush()
+        write_product_documents(db, [product])
+        bump_catalog_version(db)
         db.commit()
+        catalog_changed()
         db.refresh(product)
         return product
     return None
 
+def get_product_keys_after(db: Session, after_id: int = 0, limit: int = 500):
+    # Keyset pagination over (id, name) only, so deep chunks cost the same as the first
+    return db.query(Product.id, Product.name).filter(Product.id > after_id).order_by(Product.id).limit(limit).all()
+
+def get_product_prices_after(db: Session, after_id: int = 0, limit: int = 1000):
+    # Products scraped before raw prices were kept have nothing to recompute from
+    return (
+        db.query(Product.id, Product.ebay_prices)
+        .filter(Product.id > after_id, Product.ebay_prices.isnot(None))
+        .order_by(Product.id)
+        .limit(limit)
+        .all()
+    )
+
+def count_products_after(db: Session, after_id: int = 0):
+    return db.query(Product.id).filter(Product.id > after_id).count()
+
+def bulk_update_products(db: Session, products_data: dict):
+    """Apply {product_id: product_data} in one UPDATE ... SET col = CASE id ... statement.
+
+    Works the same on SQLite and PostgreSQL, and unlike an upsert it never
+    recreates a product that was deleted while the scrape was running.
+    Returns the number of rows updated.
+    """
+    if not products_data:
+        return 0
+    updated = update_products(db, products_data)
+    db.commit()
+    catalog_changed()
+    return updated
+
+def write_scraped_products(db: Session, products_data: dict):
+    """bulk_update_products plus record_product_observations, committed together.
+
+    A failed batch leaves neither the products nor their history half written.
+    Returns the number of rows updated.
+    """
+    if not products_data:
+        return 0
+    scraped_at = datetime.datetime.utcnow()
+    previous_prices = dict(
+        db.query(Product.id, Product.average_ebay_price).filter(Product.id.in_(list(products_data)))
+    )
+    products_data = {
+        product_id: with_schedule_values(product_data, previous_prices.get(product_id), scraped_at)
+        for product_id, product_data in products_data.items()
+    }
+    updated = update_products(db, products_data)
+    record_product_observations(db, products_data, observed_at=scraped_at)
+    db.commit()
+    catalog_changed()
+    return updated
+
+def update_products(db: Session, products_data: dict):
+    """The statements of bulk_update_products; the caller commits."""
+    products_data = {product_id: with_sort_values(product_data) for product_id, product_data in products_data.items()}
+    columns = {key for product_data in products_data.values() for key in product_data}
+    values = {}
+    for column in columns:
+        # Rows missing a column keep their current value
+        whens = {product_id: product_data[column] for product_id, product_data in products_data.items() if column in product_data}
+        values[column] = case(whens, value=Product.id, else_=getattr(Product, column))
+    result = db.execute(
+        update(Product)
+        .where(Product.id.in_(list(products_data)))
+        .values(values)
+        .execution_options(synchronize_session=False)
+    )
+    replace_product_keywords(db, {
+        product_id: parse_popular_keywords(product_data['popular_keywords'])
+        for product_id, product_data in products_data.items()
+        if 'popular_keywords' in product_data
+    })
+    # Rows as they are after the UPDATE, not as any stale copies in the session
+    write_product_documents(db, db.query(Product).filter(Product.id.in_(list(products_data))).populate_existing())
+    bump_catalog_version(db)
+    return result.rowcount
+
+def normalize_keyword(keyword: str):
+    return ' '.join(str(keyword).lower().split())
+
+def parse_popular_keywords(value):
+    """Keywords from a Product.popular_keywords value (a JSON list, or the old comma-separated form)."""
+    if not value:
+        return []
+    try:
+        keywords = json.loads(value) if isinstance(value, str) else value
+    except json.JSONDecodeError:
+        keywords = value.split(',')
+    if not isinstance(keywords, list):
+        return []
+    return [keyword for keyword in dict.fromkeys(normalize_keyword(keyword) for keyword in keywords) if keyword]
+
+def replace_product_keywords(db: Session, products_keywords: dict):
+    """Rewrite the product_keywords rows for {product_id: [keyword, ...]}; the caller commits."""
+    if not products_keywords:
+        return
+    ProductKeyword = models.ProductKeyword
+    product_ids = list(products_keywords)
+    db.query(ProductKeyword).filter(ProductKeyword.product_id.in_(product_ids)).delete(synchronize_session=False)
+    # Skip products deleted while they were being scraped
+    existing = {product_id for (product_id,) in db.query(Product.id).filter(Product.id.in_(product_ids))}
+    rows = [
+        {'product_id': product_id, 'keyword': keyword}
+        for product_id, keywords in products_keywords.items() if product_id in existing
+        for keyword in keywords
+    ]
+    if rows:
+        db.execute(insert(ProductKeyword), rows)
+
+def backfill_product_keywords(db: Session, chunk_size: int = 500):
+    """Index popular_keywords for every product; used once when the table is new."""
+    last_id = 0
+    indexed = 0
+    while True:
+        chunk = (
+            db.query(Product.id, Product.popular_keywords)
+            .filter(Product.id > last_id)
+            .order_by(Product.id)
+            .limit(chunk_size)
+            .all()
+        )
+        if not chunk:
+            return indexed
+        replace_product_keywords(db, {product_id: parse_popular_keywords(value) for product_id, value in chunk})
+        db.commit()
+        indexed += len(chunk)
+        last_id = chunk[-1][0]
+
+def get_keywords_with_prefix(db: Session, prefix: str = '', limit: int = 20):
+    """(keyword, product_count) for keywords starting with prefix, most shared first."""
+    ProductKeyword = models.ProductKeyword
+    prefix = normalize_keyword(prefix)
+    product_count = func.count(ProductKeyword.product_id).label('product_count')
+    query = db.query(ProductKeyword.keyword, product_count)
+    if prefix:
+        # A range rather than LIKE so the keyword index is used on PostgreSQL too
+        query = query.filter(ProductKeyword.keyword >= prefix, ProductKeyword.keyword < prefix + '\uffff')
+    return query.group_by(ProductKeyword.keyword).order_by(product_count.desc(), ProductKeyword.keyword).limit(limit).all()
+
+def get_products_by_keyword(db: Session, keyword: str, skip: int = 0, limit: int = 50):
+    ProductKeyword = models.ProductKeyword
+    return (
+        db.query(Product)
+        .join(ProductKeyword, ProductKeyword.product_id == Product.id)
+        .filter(ProductKeyword.keyword == normalize_keyword(keyword))
+        .order_by(Product.id)
+        .offset(skip)
+        .limit(limit)
+        .all()
+    )
+
+def search_tokens(query: str):
+    # Same word splitting as FTS5's unicode61 tokenizer
+    return re.findall(r'[^\W_]+', query.lower())
+
+# Dialects whose search index init_db has been seen to create, see search_index
+_search_indexes = {}
+
+def search_index(db: Session):
+    """'fts5' (SQLite), 'tsvector' (PostgreSQL) or None when the database has no name index."""
+    dialect = db.bind.dialect.name
+    if dialect not in _search_indexes:
+        if dialect == 'postgresql':
+            _search_indexes[dialect] = 'tsvector'
+        elif dialect == 'sqlite' and inspect(db.bind).has_table('products_fts'):
+            _search_indexes[dialect] = 'fts5'
+        else:
+            # Not cached, so the index is picked up once init_db creates it
+            return None
+    return _search_indexes[dialect]
+
+# Decimal places search scores are compared at, see search_statement
+SEARCH_SCORE_DIGITS = 9
+
+def search_statement(index, tokens, limit: int = 20, after=None, min_price: float = None, max_price: float = None, min_listings: int = None):
+    """select(Product, score) for search_products on the given search_index, limit + 1 rows."""
+    if index == 'fts5':
+        matches = (
+            text("SELECT rowid AS id, bm25(products_fts) AS score FROM products_fts WHERE products_fts MATCH :match")
+            .bindparams(match=' '.join(f'"{token}"*' for token in tokens))
+            .columns(id=Integer, score=Float)
+            .subquery()
+        )
+        score = matches.c.score
+        search = select(Product).join(matches, matches.c.id == Product.id)
+    elif index == 'tsvector':
+        # Must match the expression of the ix_products_name_search index
+        vector = func.to_tsvector('simple', func.coalesce(Product.name, ''))
+        tsquery = func.to_tsquery('simple', ' & '.join(f'{token}:*' for token in tokens))
+        score = -func.ts_rank(vector, tsquery)
+        search = select(Product).filter(vector.op('@@')(tsquery))
+    else:
+        # No index: unranked substring match
+        score = literal(0.0)
+        search = select(Product).filter(*(Product.name.ilike(f"%{token}%") for token in tokens))
+
+    # Rank, order and cursor all use the score rounded as a decimal. ts_rank is a float4,
+    # which never equals the float8 the cursor brings back, so ties would repeat or skip rows
+    score = func.round(cast(score, Numeric), SEARCH_SCORE_DIGITS, type_=Numeric(asdecimal=False))
+    search = search.add_columns(score)
+    if min_price is not None:
+        search = search.filter(Product.average_ebay_price >= min_price)
+    if max_price is not None:
+        search = search.filter(Product.average_ebay_price <= max_price)
+    if min_listings is not None:
+        search = search.filter(Product.ebay_listings >= min_listings)
+    if after is not None:
+        after_score, after_id = after
+        after_score = cast(literal(after_score, Float), Numeric)
+        search = search.filter(or_(score > after_score, and_(score == after_score, Product.id > after_id)))
+    return search.order_by(score, Product.id).limit(limit + 1)
+
+def search_page(rows, limit: int):
+    """(products, last) from the (product, score) rows of search_statement."""
+    if len(rows) <= limit:
+        return [product for product, _ in rows], None
+    rows = rows[:limit]
+    return [product for product, _ in rows], (rows[-1][1], rows[-1][0].id)
+
+def search_products(db: Session, query: str, limit: int = 20, after=None, min_price: float = None, max_price: float = None, min_listings: int = None):
+    """Products whose name has a word starting with each word of query, best match first.
+
+    Ranked by bm25 on SQLite (FTS5) and ts_rank on PostgreSQL; lower scores
+    are better. Returns (products, last) where last is the (score, id) to
+    pass back as after for the next page, or None on the last page.
+    """
+    tokens = search_tokens(query)
+    if not tokens:
+        return [], None
+    statement = search_statement(search_index(db), tokens, limit, after, min_price, max_price, min_listings)
+    return search_page(db.execute(statement).all(), limit)
+
+def get_related_products(db: Session, product_id: int, limit: int = 10):
+    """(product, shared_keyword_count) for the products sharing the most keywords with product_id."""
+    own = aliased(models.ProductKeyword)
+    other = aliased(models.ProductKeyword)
+    shared = func.count(other.keyword).label('shared_keywords')
+    return (
+        db.query(Product, shared)
+        .join(other, other.product_id == Product.id)
+        .join(own, own.keyword == other.keyword)
+        .filter(own.product_id == product_id, Product.id != product_id)
+        .group_by(Product.id)
+        .order_by(shared.desc(), Product.id)
+        .limit(limit)
+        .all()
+    )
+
+def parse_search_volume(value):
+    """Search volumes are stored on Product as display strings like '1,234'."""
+    try:
+        return int(str(value).replace(',', ''))
+    except (TypeError, ValueError):
+        return None
+
+def record_product_observations(db: Session, products_data: dict, observed_at: datetime.datetime = None):
+    """Append one observation per scraped product and fold it into the daily rollups.
+
+    Returns the number of observations written; products deleted while they
+    were being scraped are skipped. The caller commits.
+    """
+    if not products_data:
+        return 0
+    observed_at = observed_at or datetime.datetime.utcnow()
+    existing = {product_id for (product_id,) in db.query(Product.id).filter(Product.id.in_(list(products_data)))}
+    observations = []
+    for product_id, product_data in products_data.items():
+        if product_id not in existing:
+            continue
+        priced = bool(product_data.get('ebay_price_count', 1)) and bool(product_data.get('average_ebay_price'))
+        observations.append({
+            'product_id': product_id,
+            'observed_at': observed_at,
+            'average_ebay_price': product_data.get('average_ebay_price') if priced else None,
+            'ebay_price_median': product_data.get('ebay_price_median') if priced else None,
+            'ebay_listings': product_data.get('ebay_listings'),
+            'ebay_sale_amount': product_data.get('ebay_sale_amount'),
+            'search_volume_us': parse_search_volume(product_data.get('search_volume_us')),
+            'search_volume_au': parse_search_volume(product_data.get('search_volume_au')),
+            'search_volume_uk': parse_search_volume(product_data.get('search_volume_uk')),
+        })
+    if not observations:
+        return 0
+    db.execute(insert(models.ProductObservation), observations)
+
+    rollups = [{
+        'product_id': row['product_id'],
+        'day': observed_at.date(),
+        'samples': 1,
+        'priced_samples': 1 if row['average_ebay_price'] is not None else 0,
+        'price_sum': row['average_ebay_price'] or 0,
+        'price_min': row['average_ebay_price'],
+        'price_max': row['average_ebay_price'],
+        'median_sum': row['ebay_price_median'] or row['average_ebay_price'] or 0,
+        'listings_sum': row['ebay_listings'] or 0,
+        'sale_amount_sum': row['ebay_sale_amount'] or 0,
+        'search_volume_us_sum': row['search_volume_us'] or 0,
+        'search_volume_au_sum': row['search_volume_au'] or 0,
+        'search_volume_uk_sum': row['search_volume_uk'] or 0,
+    } for row in observations]
+    Daily = models.ProductObservationDaily
+    dialect_insert = postgresql.insert if db.bind.dialect.name == 'postgresql' else sqlite.insert
+    stmt = dialect_insert(Daily)
+    added = stmt.excluded
+    summed = [
+        'samples', 'priced_samples', 'price_sum', 'median_sum', 'listings_sum', 'sale_amount_sum',
+        'search_volume_us_sum', 'search_volume_au_sum', 'search_volume_uk_sum',
+    ]
+    updates = {column: getattr(Daily, column) + getattr(added, column) for column in summed}
+    # LEAST/GREATEST don't exist on SQLite and its min()/max() return NULL if either side is NULL
+    updates['price_min'] = case(
+        (Daily.price_min.is_(None), added.price_min),
+        (added.price_min < Daily.price_min, added.price_min),
+        else_=Daily.price_min,
+    )
+    updates['price_max'] = case(
+        (Daily.price_max.is_(None), added.price_max),
+        (added.price_max > Daily.price_max, added.price_max),
+        else_=Daily.price_max,
+    )
+    db.execute(stmt.on_conflict_do_update(index_elements=['product_id', 'day'], set_=updates), rollups)
+    return len(observations)
+
+def get_product_observations(db: Session, product_id: int, start: datetime.datetime, end: datetime.datetime):
+    Observation = models.ProductObservation
+    return (
+        db.query(Observation)
+        .filter(Observation.product_id == product_id, Observation.observed_at >= start, Observation.observed_at < end)
+        .order_by(Observation.observed_at)
+        .all()
+    )
+
+def get_recent_observations(db: Session, product_ids, per_product: int = 2):
+    """{product_id: [(observed_at, average_ebay_price), ...]} of each product's latest observations, newest first."""
+    Observation = models.ProductObservation
+    rank = func.row_number().over(partition_by=Observation.product_id, order_by=Observation.observed_at.desc())
+    recent = (
+        select(Observation.product_id, Observation.observed_at, Observation.average_ebay_price, rank.label('rank'))
+        .where(Observation.product_id.in_(list(product_ids)))
+        .subquery()
+    )
+    rows = db.execute(
+        select(recent.c.product_id, recent.c.observed_at, recent.c.average_ebay_price)
+        .where(recent.c.rank <= per_product)
+        .order_by(recent.c.product_id, recent.c.rank)
+    )
+    observations = {}
+    for product_id, observed_at, price in rows:
+        observations.setdefault(product_id, []).append((observed_at, price))
+    return observations
+
+def get_product_daily_rollups(db: Session, product_id: int, start: datetime.date, end: datetime.date):
+    Daily = models.ProductObservationDaily
+    return (
+        db.query(Daily)
+        .filter(Daily.product_id == product_id, Daily.day >= start, Daily.day <= end)
+        .order_by(Daily.day)
+        .all()
+    )
+
 def get_user_by_username(db: Session, username: str):
     return db.query(models.User).filter(models.User.username == username).first()
 
@@ -78,3 +709,133 @@ def update_user_subscription(db: Session, user_id: int, plan: str, start: dateti
         return user
     return None
 
+def get_checkpoint(db: Session, name: str):
+    return db.query(models.ScrapeCheckpoint).filter(models.ScrapeCheckpoint.name == name).first()
+
+def save_checkpoint(db: Session, name: str, last_product_id: int):
+    checkpoint = get_checkpoint(db, name)
+    now = datetime.datetime.utcnow()
+    if checkpoint:
+        checkpoint.last_product_id = last_product_id
+        checkpoint.updated_at = now
+    else:
+        checkpoint = models.ScrapeCheckpoint(name=name, last_product_id=last_product_id, started_at=now, updated_at=now)
+        db.add(checkpoint)
+    db.commit()
+    return checkpoint
+
+def delete_checkpoint(db: Session, name: str):
+    checkpoint = get_checkpoint(db, name)
+    if checkpoint:
+        db.delete(checkpoint)
+        db.commit()
+
+def get_active_scrape_job(db: Session, product_id: int = None):
+    """Return the queued or running job for product_id (None for the full catalog)."""
+    ScrapeJob = models.ScrapeJob
+    return (
+        db.query(ScrapeJob)
+        .filter(ScrapeJob.dedupe_key == (product_id or 0), ScrapeJob.status.in_(["queued", "running"]))
+        .first()
+    )
+
+def get_active_scrape_jobs(db: Session):
+    return db.query(models.ScrapeJob).filter(models.ScrapeJob.status.in_(["queued", "running"])).all()
+
+def enqueue_scrape_job(db: Session, product_id: int = None, engine: str = None):
+    """Queue a scrape unless one already covers the target; returns (job, created).
+
+    A product trigger attaches to an active job for the same product, or to
+    a full-catalog job that has not got past that product yet. A second
+    full-catalog trigger attaches to the one already active. The partial
+    unique index on dedupe_key settles races between concurrent requests.
+    """
+    existing = get_active_scrape_job(db, product_id)
+    if existing:
+        return existing, False
+    if product_id:
+        full_run = get_active_scrape_job(db, None)
+        if full_run:
+            checkpoint = get_checkpoint(db, "full_catalog")
+            watermark = checkpoint.last_product_id if checkpoint and full_run.status == "running" else 0
+            if product_id > (watermark or 0):
+                return full_run, False
+
+    job = models.ScrapeJob(product_id=product_id, engine=engine, status="queued", dedupe_key=product_id or 0)
+    db.add(job)
+    try:
+        db.commit()
+    except IntegrityError:
+        # Another request queued the same target between our check and insert
+        db.rollback()
+        return get_active_scrape_job(db, product_id), False
+    db.refresh(job)
+    return job, True
+
+def get_scrape_job(db: Session, job_id: int):
+    return db.query(models.ScrapeJob).filter(models.ScrapeJob.id == job_id).first()
+
+def get_scrape_jobs(db: Session, limit: int = 20, status: str = None):
+    query = db.query(models.ScrapeJob)
+    if status:
+        query = query.filter(models.ScrapeJob.status == status)
+    return query.order_by(models.ScrapeJob.id.desc()).limit(limit).all()
+
+def claim_next_scrape_job(db: Session, worker_id: str):
+    """Mark the oldest queued job as running for worker_id and return it, or None.
+
+    On PostgreSQL the candidate row is locked with SKIP LOCKED so workers never
+    wait on each other; the conditional UPDATE makes the claim safe on SQLite,
+    which ignores row locks.
+    """
+    ScrapeJob = models.ScrapeJob
+    job = (
+        db.query(ScrapeJob)
+        .filter(ScrapeJob.status == "queued")
+        .order_by(ScrapeJob.id)
+        .with_for_update(skip_locked=True)
+        .first()
+    )
+    if not job:
+        db.rollback()
+        return None
+    now = datetime.datetime.utcnow()
+    claimed = (
+        db.query(ScrapeJob)
+        .filter(ScrapeJob.id == job.id, ScrapeJob.status == "queued")
+        .update(
+            {
+                "status": "running",
+                "worker_id": worker_id,
+                "attempts": ScrapeJob.attempts + 1,
+                "started_at": now,
+                "heartbeat_at": now,
+                "error": None,
+            },
+            synchronize_session=False,
+        )
+    )
+    db.commit()
+    if not claimed:
+        return None
+    db.refresh(job)
+    return job
+
+def update_scrape_job(db: Session, job_id: int, **fields):
+    db.query(models.ScrapeJob).filter(models.ScrapeJob.id == job_id).update(fields, synchronize_session=False)
+    db.commit()
+
+def requeue_stale_scrape_jobs(db: Session, stale_before: datetime.datetime, max_attempts: int = 3):
+    """Requeue running jobs whose worker stopped heartbeating, or fail them after max_attempts."""
+    ScrapeJob = models.ScrapeJob
+    stale = db.query(ScrapeJob).filter(ScrapeJob.status == "running", ScrapeJob.heartbeat_at < stale_before).all()
+    for job in stale:
+        if (job.attempts or 0) >= max_attempts:
+            job.status = "failed"
+            job.error = "Worker stopped responding"
+            job.finished_at = datetime.datetime.utcnow()
+        else:
+            job.status = "queued"
+            job.worker_id = None
+    db.commit()
+    return stale
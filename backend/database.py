@@ -1,8 +1,9 @@
-from sqlalchemy import create_engine, inspect, text
+from sqlalchemy import create_engine, inspect, make_url, text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 import os
-from passlib.context import CryptContext
+from backend.services.password_hashing import pwd_context
 
 # Create Base here to avoid circular imports
 Base = declarative_base()
@@ -31,14 +32,56 @@ else:
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
-# Password hashing context
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+def async_database_url(url):
+    """DATABASE_URL for the async drivers, plus the connect_args it needs."""
+    url = make_url(url)
+    if url.drivername == "sqlite":
+        return url.set(drivername="sqlite+aiosqlite"), {}
+    # asyncpg takes the libpq sslmode as its ssl argument
+    sslmode = url.query.get("sslmode")
+    url = url.set(drivername="postgresql+asyncpg").difference_update_query(["sslmode"])
+    return url, ({"ssl": sslmode} if sslmode else {})
+
+# Async engine for the API routes that run on the event loop (asyncpg on
+# PostgreSQL, aiosqlite locally). It has its own pool next to the sync engine's,
+# which the worker, init_db and the remaining sync routes keep using.
+ASYNC_DATABASE_URL, async_connect_args = async_database_url(DATABASE_URL)
+if ASYNC_DATABASE_URL.drivername == "sqlite+aiosqlite":
+    async_engine = create_async_engine(ASYNC_DATABASE_URL, connect_args=async_connect_args)
+else:
+    async_engine = create_async_engine(
+        ASYNC_DATABASE_URL,
+        connect_args=async_connect_args,
+        pool_size=int(os.getenv("DB_ASYNC_POOL_SIZE", "5")),
+        max_overflow=int(os.getenv("DB_ASYNC_MAX_OVERFLOW", "10")),
+        pool_timeout=30,
+        pool_recycle=1800,
+    )
+
+# expire_on_commit=False: attributes can't lazy-load on an AsyncSession
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
+# Keep the FTS5 index of product names in step with the products table
+SQLITE_SEARCH_TRIGGERS = (
+    """CREATE TRIGGER IF NOT EXISTS products_fts_insert AFTER INSERT ON products BEGIN
+        INSERT INTO products_fts(rowid, name) VALUES (new.id, new.name);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS products_fts_delete AFTER DELETE ON products BEGIN
+        INSERT INTO products_fts(products_fts, rowid, name) VALUES ('delete', old.id, old.name);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS products_fts_update AFTER UPDATE OF name ON products BEGIN
+        INSERT INTO products_fts(products_fts, rowid, name) VALUES ('delete', old.id, old.name);
+        INSERT INTO products_fts(rowid, name) VALUES (new.id, new.name);
+    END""",
+)
 
 def init_db():
     print("Initializing the database...")
     try:
         # Import models here to avoid circular imports
-        from backend.models import Product, User  # Adjust import path based on your project structure
+        from backend.models import CatalogVersion, Product, ProductDocument, ProductKeyword, ProductObservation, ProductObservationDaily, User, ScrapeCheckpoint, ScrapeJob  # Adjust import path based on your project structure
+        new_keyword_table = not inspect(engine).has_table("product_keywords")
+        new_document_table = not inspect(engine).has_table("product_documents")
         Base.metadata.create_all(bind=engine)
         print("Tables created successfully!")
 
@@ -65,6 +108,66 @@ def init_db():
                 except Exception as e:
                     print(f"Error adding column: {e}")
 
+            # Add the price statistics columns (and the raw prices they are computed from)
+            price_columns = {
+                'ebay_price_median': 'FLOAT',
+                'ebay_price_trimmed_mean': 'FLOAT',
+                'ebay_price_p10': 'FLOAT',
+                'ebay_price_p25': 'FLOAT',
+                'ebay_price_p75': 'FLOAT',
+                'ebay_price_p90': 'FLOAT',
+                'ebay_price_count': 'INTEGER',
+                'ebay_price_outliers': 'INTEGER',
+                'ebay_prices': 'TEXT',
+            }
+            for column, column_type in price_columns.items():
+                if column not in columns:
+                    try:
+                        with engine.begin() as conn:
+                            conn.execute(text(f"ALTER TABLE products ADD COLUMN {column} {column_type}"))
+                        print(f"Added '{column}' column to 'products' table")
+                    except Exception as e:
+                        print(f"Error adding {column} column: {e}")
+
+            # Numeric copy of search_volume_us that the listing API sorts on
+            if 'search_volume_us_value' not in columns:
+                from backend.crud import backfill_search_volume_values
+                db = SessionLocal()
+                try:
+                    with engine.begin() as conn:
+                        conn.execute(text("ALTER TABLE products ADD COLUMN search_volume_us_value INTEGER"))
+                    print(f"Added 'search_volume_us_value' column, filled for {backfill_search_volume_values(db)} products")
+                except Exception as e:
+                    print(f"Error adding search_volume_us_value column: {e}")
+                    db.rollback()
+                finally:
+                    db.close()
+
+            # Ranking columns of the incremental scheduler
+            if 'last_scraped_at' not in columns:
+                from backend.crud import backfill_schedule_values
+                db = SessionLocal()
+                try:
+                    with engine.begin() as conn:
+                        if DATABASE_URL.startswith('sqlite'):
+                            conn.execute(text("ALTER TABLE products ADD COLUMN last_scraped_at DATETIME"))
+                        else:  # PostgreSQL
+                            conn.execute(text("ALTER TABLE products ADD COLUMN last_scraped_at TIMESTAMP"))
+                        conn.execute(text("ALTER TABLE products ADD COLUMN scrape_weight FLOAT"))
+                    print(f"Added 'last_scraped_at' and 'scrape_weight' columns, filled for {backfill_schedule_values(db)} products")
+                except Exception as e:
+                    print(f"Error adding scheduler columns: {e}")
+                    db.rollback()
+                finally:
+                    db.close()
+
+            # Sort indexes for the product listing API
+            try:
+                for index in Product.__table__.indexes:
+                    index.create(bind=engine, checkfirst=True)
+            except Exception as e:
+                print(f"Error creating products indexes: {e}")
+
             # Create a test product if it doesn't already exist
             db = SessionLocal()
             try:
@@ -153,6 +256,75 @@ def init_db():
                     print(f"Error adding stripe_subscription_id column: {e}")
         else:
             print("Users table not found, but will be created on first application run")
+
+        # Add the dedupe column and index used to coalesce duplicate scrape jobs
+        if "scrape_jobs" in tables:
+            job_columns = [col['name'] for col in inspector.get_columns('scrape_jobs')]
+            if 'dedupe_key' not in job_columns:
+                try:
+                    with engine.begin() as conn:
+                        conn.execute(text("ALTER TABLE scrape_jobs ADD COLUMN dedupe_key INTEGER"))
+                        conn.execute(text("UPDATE scrape_jobs SET dedupe_key = COALESCE(product_id, 0)"))
+                    print("Added 'dedupe_key' column to 'scrape_jobs' table")
+                except Exception as e:
+                    print(f"Error adding dedupe_key column: {e}")
+            try:
+                for index in ScrapeJob.__table__.indexes:
+                    index.create(bind=engine, checkfirst=True)
+            except Exception as e:
+                print(f"Error creating scrape_jobs indexes: {e}")
+
+        # Index existing popular_keywords the first time the keyword table appears
+        if new_keyword_table:
+            from backend.crud import backfill_product_keywords
+            db = SessionLocal()
+            try:
+                print(f"Indexed keywords for {backfill_product_keywords(db)} products")
+            except Exception as e:
+                print(f"Error indexing product keywords: {e}")
+                db.rollback()
+            finally:
+                db.close()
+
+        # Full-text index on product names for /search/
+        try:
+            with engine.begin() as conn:
+                if DATABASE_URL.startswith('sqlite'):
+                    new_search_index = not inspect(conn).has_table("products_fts")
+                    conn.execute(text("CREATE VIRTUAL TABLE IF NOT EXISTS products_fts USING fts5(name, content='products', content_rowid='id')"))
+                    for trigger in SQLITE_SEARCH_TRIGGERS:
+                        conn.execute(text(trigger))
+                    if new_search_index:
+                        conn.execute(text("INSERT INTO products_fts(products_fts) VALUES ('rebuild')"))
+                else:  # PostgreSQL
+                    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_products_name_search ON products USING gin (to_tsvector('simple', coalesce(name, '')))"))
+        except Exception as e:
+            print(f"Error creating product search index: {e}")
+
+        # Serialize every existing product the first time the document table appears
+        if new_document_table:
+            from backend.crud import backfill_product_documents
+            db = SessionLocal()
+            try:
+                print(f"Wrote documents for {backfill_product_documents(db)} products")
+            except Exception as e:
+                print(f"Error writing product documents: {e}")
+                db.rollback()
+            finally:
+                db.close()
+
+        # Seed the catalog version row here, so concurrent first writes only ever UPDATE it
+        from backend.crud import CATALOG_VERSION_ID
+        db = SessionLocal()
+        try:
+            if db.get(CatalogVersion, CATALOG_VERSION_ID) is None:
+                db.add(CatalogVersion(id=CATALOG_VERSION_ID, version=0))
+                db.commit()
+        except Exception as e:
+            print(f"Error seeding the catalog version: {e}")
+            db.rollback()
+        finally:
+            db.close()
             
         print("Database initialization complete.")
         return True
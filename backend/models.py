@@ -1,23 +1,95 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey
+from sqlalchemy import BigInteger, Column, Integer, LargeBinary, String, Float, Date, DateTime, ForeignKey, Index, text
 from sqlalchemy.orm import relationship
 from backend.database import Base
 import datetime
 
 class Product(Base):
     __tablename__ = "products"
+    # (sort key, id) for every sort key of crud.list_products, so each keyset page is one index range scan
+    __table_args__ = (
+        Index("ix_products_name_id", "name", "id"),
+        Index("ix_products_price_id", "average_ebay_price", "id"),
+        Index("ix_products_listings_id", "ebay_listings", "id"),
+        Index("ix_products_sale_amount_id", "ebay_sale_amount", "id"),
+        Index("ix_products_search_volume_us_id", "search_volume_us_value", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, index=True)
     image_url = Column(String)
     average_ebay_price = Column(Float, nullable=True)
+    # Robust statistics over the sold prices, see services/price_stats.py
+    ebay_price_median = Column(Float, nullable=True)
+    ebay_price_trimmed_mean = Column(Float, nullable=True)
+    ebay_price_p10 = Column(Float, nullable=True)
+    ebay_price_p25 = Column(Float, nullable=True)
+    ebay_price_p75 = Column(Float, nullable=True)
+    ebay_price_p90 = Column(Float, nullable=True)
+    ebay_price_count = Column(Integer, nullable=True)  # Prices kept after outlier removal
+    ebay_price_outliers = Column(Integer, nullable=True)
+    ebay_prices = Column(String, nullable=True)  # Raw sold prices as a JSON list, for recomputing the statistics
     ebay_listings = Column(Integer, nullable=True)
     ebay_sale_amount = Column(Float, nullable=True)
     search_volume_us = Column(String, nullable=True)
     search_volume_au = Column(String, nullable=True)
     search_volume_uk = Column(String, nullable=True)
+    search_volume_us_value = Column(Integer, nullable=True)  # search_volume_us as a number, for sorting
     popular_keywords = Column(String, nullable=True)  # Store as JSON string
     vendor = Column(String, nullable=True)  # Store as JSON string
     last_updated = Column(String, nullable=True)  # Store as ISO format date string
+    # Ranking inputs of the incremental scheduler, set with every scrape write
+    last_scraped_at = Column(DateTime, nullable=True)  # UTC, to the second
+    scrape_weight = Column(Float, nullable=True)  # See crud.scrape_weight
+
+class ProductDocument(Base):
+    """The product's API JSON, rewritten with every product write so reads send the bytes as-is."""
+    __tablename__ = "product_documents"
+
+    product_id = Column(Integer, ForeignKey("products.id", ondelete="CASCADE"), primary_key=True)
+    body = Column(LargeBinary, nullable=False)  # See services/product_documents.py
+
+class ProductKeyword(Base):
+    __tablename__ = "product_keywords"
+
+    # One row per keyword in Product.popular_keywords, so products can be looked up by keyword
+    product_id = Column(Integer, ForeignKey("products.id", ondelete="CASCADE"), primary_key=True)
+    keyword = Column(String, primary_key=True, index=True)  # Lower-cased and whitespace-normalized
+
+class ProductObservation(Base):
+    """One row per scrape of a product, never updated; Product holds only the latest values."""
+    __tablename__ = "product_observations"
+    __table_args__ = (
+        Index("ix_product_observations_product_time", "product_id", "observed_at"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    product_id = Column(Integer, ForeignKey("products.id", ondelete="CASCADE"), nullable=False)
+    observed_at = Column(DateTime, nullable=False, default=datetime.datetime.utcnow)
+    average_ebay_price = Column(Float, nullable=True)  # None when the scrape found no sold prices
+    ebay_price_median = Column(Float, nullable=True)
+    ebay_listings = Column(Integer, nullable=True)
+    ebay_sale_amount = Column(Float, nullable=True)
+    search_volume_us = Column(Integer, nullable=True)
+    search_volume_au = Column(Integer, nullable=True)
+    search_volume_uk = Column(Integer, nullable=True)
+
+class ProductObservationDaily(Base):
+    """Per-product, per-day sums of product_observations, kept up to date as observations are written."""
+    __tablename__ = "product_observations_daily"
+
+    product_id = Column(Integer, ForeignKey("products.id", ondelete="CASCADE"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    samples = Column(Integer, default=0)
+    priced_samples = Column(Integer, default=0)  # Observations with sold prices; the price columns average over these
+    price_sum = Column(Float, default=0)
+    price_min = Column(Float, nullable=True)
+    price_max = Column(Float, nullable=True)
+    median_sum = Column(Float, default=0)
+    listings_sum = Column(BigInteger, default=0)
+    sale_amount_sum = Column(Float, default=0)
+    search_volume_us_sum = Column(BigInteger, default=0)
+    search_volume_au_sum = Column(BigInteger, default=0)
+    search_volume_uk_sum = Column(BigInteger, default=0)
 
 class User(Base):
     __tablename__ = "users"
@@ -29,4 +101,48 @@ class User(Base):
     plan = Column(String, default="free")  # Possible values: "free", "pro-lite", "pro", "exclusive"
     subscription_start = Column(DateTime, nullable=True)
     subscription_end = Column(DateTime, nullable=True)
-    stripe_subscription_id = Column(String, nullable=True)  # Add this line
\ No newline at end of file
+    stripe_subscription_id = Column(String, nullable=True)  # Add this line
+
+class CatalogVersion(Base):
+    __tablename__ = "catalog_version"
+
+    id = Column(Integer, primary_key=True)  # A single row, CATALOG_VERSION_ID in crud
+    version = Column(BigInteger, default=0)  # Bumped with every product write
+
+class ScrapeCheckpoint(Base):
+    __tablename__ = "scrape_checkpoints"
+
+    name = Column(String, primary_key=True)  # e.g. "full_catalog"
+    last_product_id = Column(Integer, default=0)  # Every product up to this ID has been written
+    started_at = Column(DateTime, default=datetime.datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.datetime.utcnow)
+
+# Jobs that still hold their target; at most one per product (or full catalog)
+ACTIVE_SCRAPE_JOB = "status IN ('queued', 'running')"
+
+class ScrapeJob(Base):
+    __tablename__ = "scrape_jobs"
+    __table_args__ = (
+        Index(
+            "ix_scrape_jobs_active_target",
+            "dedupe_key",
+            unique=True,
+            sqlite_where=text(ACTIVE_SCRAPE_JOB),
+            postgresql_where=text(ACTIVE_SCRAPE_JOB),
+        ),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    product_id = Column(Integer, nullable=True)  # None means the full catalog
+    dedupe_key = Column(Integer, nullable=True)  # product_id, or 0 for the full catalog
+    engine = Column(String, nullable=True)  # None uses SCRAPER_ENGINE
+    status = Column(String, default="queued", index=True)  # Possible values: "queued", "running", "succeeded", "failed"
+    attempts = Column(Integer, default=0)
+    worker_id = Column(String, nullable=True)
+    products_done = Column(Integer, default=0)
+    products_total = Column(Integer, nullable=True)
+    error = Column(String, nullable=True)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+    started_at = Column(DateTime, nullable=True)
+    heartbeat_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
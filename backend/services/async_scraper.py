@@ -0,0 +1,255 @@
+import asyncio
+import json
+import os
+import time
+
+import httpx
+
+from .keyword_suggestions import keyword_suggestions_url
+from .metrics import UPSTREAM_RETRIES, observe_upstream
+from .product_writer import BulkProductWriter
+from .proxy_pool import ProxyBannedError
+from .scraper import MarketplaceScraper
+from .search_volume import keyword_batches, search_volume_url
+
+
+class AsyncMarketplaceScraper(MarketplaceScraper):
+    """Asyncio scraping engine built on httpx.AsyncClient.
+
+    ``max_concurrency`` caps the number of upstream requests in flight across
+    the whole run, ``per_product_concurrency`` caps how many of one product's
+    requests (eBay page, search volumes, keywords) run at the same time.
+    """
+
+    engine = 'async'
+
+    def __init__(self, max_concurrency: int = None, per_product_concurrency: int = None, sessions=None):
+        super().__init__(sessions=sessions)
+        self.max_concurrency = max_concurrency or int(os.getenv('SCRAPER_CONCURRENCY', '10'))
+        self.per_product_concurrency = per_product_concurrency or int(os.getenv('SCRAPER_PRODUCT_CONCURRENCY', '5'))
+        self._request_slots = None
+
+    async def _get(self, url, proxy=None):
+        # Wait for the host's rate limit before taking a request slot, so a
+        # throttled host doesn't hold up requests to the others
+        await asyncio.sleep(self.rate_limiter.reserve(url))
+        async with self._request_slots:
+            return await self.sessions.aget(url, proxy=proxy)
+
+    async def fetch_page_content_async(self, url, retries=3, delay=None):
+        cached = self.cache.get('ebay', url)
+        if cached is not None:
+            return cached
+        if not self.proxies:
+            raise ValueError("No proxies loaded. Please check your proxy file.")
+
+        for attempt in range(1, retries + 1):
+            proxy = self.proxies.acquire()
+            started = time.monotonic()
+            try:
+                response = await self._get(url, proxy.url)
+                if self.proxies.is_ban(response.status_code, response.text):
+                    raise ProxyBannedError(f"Proxy {proxy.label} blocked with status {response.status_code}", response)
+                response.raise_for_status()
+                self.proxies.report_success(proxy, time.monotonic() - started)
+                observe_upstream('ebay', started)
+                self.cache.set('ebay', url, response.text)
+                return response.text
+            except Exception as e:
+                banned = isinstance(e, ProxyBannedError)
+                self.proxies.report_failure(proxy, banned=banned)
+                observe_upstream('ebay', started, 'banned' if banned else 'error')
+                print(f"Attempt {attempt} failed for URL: {url} with error: {e}")
+                if attempt < retries:
+                    UPSTREAM_RETRIES.labels('ebay').inc()
+                    await asyncio.sleep(self.retry_wait(url, attempt, e, delay))
+                else:
+                    print(f"All {retries} attempts failed for URL: {url}")
+                    return None
+
+    async def fetch_json_async(self, url, retries=3, delay=None, parse=None):
+        if not self.proxies:
+            raise ValueError("No proxies loaded. Please check your proxy file.")
+
+        for attempt in range(retries):
+            proxy = self.proxies.acquire()
+            started = time.monotonic()
+            try:
+                response = await self._get(url, proxy.url)
+                if self.proxies.is_ban(response.status_code):
+                    raise ProxyBannedError(f"Proxy {proxy.label} blocked with status {response.status_code}", response)
+                response.raise_for_status()
+                data = response.json()
+                if data and parse:
+                    data = parse(data)
+                self.proxies.report_success(proxy, time.monotonic() - started)
+                observe_upstream('search_volume', started)
+                if data:
+                    return data, response.text
+            except Exception as e:
+                banned = isinstance(e, ProxyBannedError)
+                self.proxies.report_failure(proxy, banned=banned)
+                observe_upstream('search_volume', started, 'banned' if banned else 'error')
+                print(f"Attempt {attempt + 1} failed: {e}")
+                if attempt < retries - 1:
+                    UPSTREAM_RETRIES.labels('search_volume').inc()
+                    await asyncio.sleep(self.retry_wait(url, attempt + 1, e, delay))
+                else:
+                    print("All retry attempts failed.")
+        return None, None
+
+    async def search_volume_async(self, keywords, country_code, retries=3, delay=None):
+        url = search_volume_url(keywords, country_code)
+        cached = self.cached_search_volume(url)
+        if cached is not None:
+            try:
+                return self.parse_search_volume(json.loads(cached))
+            except (ValueError, TypeError, AttributeError) as e:
+                print(f"Ignoring unreadable search volume response for {url}: {e}")
+        volume, body = await self.fetch_json_async(url, retries, delay, parse=self.parse_search_volume)
+        # Only bodies that parsed are cached
+        if volume:
+            self.cache.set('search_volume', url, body)
+        return volume
+
+    async def prefetch_search_volumes_async(self, product_names):
+        async def fetch_batch(batch, country_code):
+            data, _ = await self.fetch_json_async(search_volume_url(batch, country_code))
+            if data:
+                self.store_search_volumes(batch, country_code, data)
+
+        await asyncio.gather(*(
+            fetch_batch(batch, country_code)
+            for country_code, names in self.missing_search_volumes(product_names)
+            for batch in keyword_batches(names, self.search_volume_batch_size)
+        ))
+
+    async def feed_with_search_volumes(self, product_list, queue: asyncio.Queue, done, workers: int):
+        """Put products on queue, prefetching search volumes one batch ahead.
+
+        Like with_search_volumes, stops handing out products once the deadline
+        has passed. Ends with one ``done`` marker per worker.
+        """
+        for chunk in self.product_chunks(product_list):
+            if self.past_deadline():
+                break
+            await self.prefetch_search_volumes_async([name for _, name in chunk])
+            for item in chunk:
+                if self.past_deadline():
+                    break
+                await queue.put(item)
+        for _ in range(workers):
+            await queue.put(done)
+
+    async def fetch_popular_keywords_async(self, base_keyword):
+        suggestions = self.cached_keyword_suggestions(base_keyword)
+        if suggestions is not None:
+            return json.dumps(suggestions)
+        started = time.monotonic()
+        try:
+            response = await self._get(keyword_suggestions_url(base_keyword))
+        except httpx.HTTPError as e:
+            observe_upstream('keywords', started, 'error')
+            print(f"Error fetching keyword suggestions: {e}")
+            return json.dumps([])
+        observe_upstream('keywords', started, 'ok' if response.status_code == 200 else 'error')
+
+        if response.status_code == 200:
+            suggestions = self.store_keyword_suggestions(base_keyword, response.text)
+            if suggestions is not None:
+                return json.dumps(suggestions)
+
+        return json.dumps([])
+
+    async def fetch_ebay_pages_async(self, keywords):
+        """HTML of each results page worth reading: the first, then the rest concurrently."""
+        first_page = await self.fetch_page_content_async(self.generate_url(keywords))
+        if not first_page:
+            return []
+        rest = await asyncio.gather(*(
+            self.fetch_page_content_async(self.generate_url(keywords, page))
+            for page in self.ebay_extra_pages(first_page)
+        ))
+        return [first_page, *(html for html in rest if html)]
+
+    async def _scrape_ebay(self, product_name):
+        ebay_url = self.generate_url(product_name)
+        print(f"Scraping eBay URL: {ebay_url}")
+        pages = await self.fetch_ebay_pages_async(product_name)
+        if not pages:
+            return [], []
+        # Parsing is CPU bound, keep it off the event loop
+        ebay_prices, ebay_listings = self.merge_ebay_pages(
+            await asyncio.gather(*(asyncio.to_thread(self.parse_ebay_results, html) for html in pages))
+        )
+        print(f"eBay prices: {ebay_prices}")
+        return ebay_prices, ebay_listings
+
+    async def gather_product_requests(self, *coros):
+        """asyncio.gather for one product's requests, at most per_product_concurrency at a time."""
+        product_slots = asyncio.Semaphore(self.per_product_concurrency)
+
+        async def limited(coro):
+            async with product_slots:
+                return await coro
+
+        return await asyncio.gather(*(limited(coro) for coro in coros))
+
+    async def scrape_product_async(self, product_name):
+        (ebay_prices, ebay_listings), search_volume_us, search_volume_au, search_volume_uk, popular_keywords = await self.gather_product_requests(
+            self._scrape_ebay(product_name),
+            self.search_volume_async(product_name, 'us'),
+            self.search_volume_async(product_name, 'au'),
+            self.search_volume_async(product_name, 'gb'),
+            self.fetch_popular_keywords_async(product_name),
+        )
+        return self.build_product_data(
+            ebay_prices, ebay_listings, search_volume_us, search_volume_au, search_volume_uk, popular_keywords
+        )
+
+    async def scrape_products_async(self, product_list, collect_results=True, on_flush=None):
+        results = {}
+        scraped = 0
+        self._request_slots = asyncio.Semaphore(self.max_concurrency)
+        products = asyncio.Queue(2 * self.max_concurrency)
+        writer = BulkProductWriter(on_flush=on_flush)
+
+        async def worker():
+            nonlocal scraped
+            while True:
+                item = await products.get()
+                if item is None:
+                    return
+                product_id, product_name = item
+                self.product_started(product_id)
+                try:
+                    product_data = await self.scrape_product_async(product_name)
+                except Exception as e:
+                    print(f"Error scraping product ID '{product_id}': {e}")
+                    await asyncio.to_thread(writer.mark_failed, product_id)
+                    self.product_finished(product_id, ok=False)
+                    continue
+                print(f"Queueing update for product ID '{product_id}' with data: {product_data}")
+                # A full batch is flushed inside add, keep that off the event loop
+                await asyncio.to_thread(writer.add, product_id, product_data)
+                self.product_finished(product_id)
+                scraped += 1
+                if collect_results:
+                    results[product_id] = product_data
+
+        try:
+            await asyncio.gather(
+                self.feed_with_search_volumes(product_list, products, None, self.max_concurrency),
+                *(worker() for _ in range(self.max_concurrency)),
+            )
+        finally:
+            await asyncio.to_thread(writer.close)
+            # Async clients are bound to this event loop, so they go with it
+            await self.sessions.aclose()
+        print(f"Proxy pool stats: {self.proxies.stats()}")
+        print(f"Response cache stats: {self.cache.stats()}")
+        print(f"Keyword cache stats: {self.keyword_cache.stats()}")
+        return results if collect_results else {'products_scraped': scraped}
+
+    def scrape_products(self, product_list, collect_results=True, on_flush=None):
+        return asyncio.run(self.scrape_products_async(product_list, collect_results, on_flush))
@@ -0,0 +1,84 @@
+import collections
+import datetime
+import os
+
+from ..crud import delete_checkpoint, get_checkpoint, get_product_keys_after, save_checkpoint
+from ..database import SessionLocal
+
+
+def iter_catalog(start_after: int = 0, chunk_size: int = None):
+    """Yield (id, name) for every product in ID order, one keyset page at a time.
+
+    Each chunk uses its own short-lived session so a long scrape never holds a
+    pooled connection between pages.
+    """
+    chunk_size = chunk_size or int(os.getenv('SCRAPER_CATALOG_CHUNK', '500'))
+    last_id = start_after
+    while True:
+        db = SessionLocal()
+        try:
+            chunk = get_product_keys_after(db, last_id, chunk_size)
+        finally:
+            db.close()
+        if not chunk:
+            return
+        for product_id, product_name in chunk:
+            yield product_id, product_name
+        last_id = chunk[-1][0]
+
+
+class CatalogCheckpoint:
+    """Persists how far a full-catalog run got, so a restarted run can resume.
+
+    Products are handed out in ID order but may finish out of order, so the
+    stored ID is a watermark: every product up to it has been written (or
+    has failed). Checkpoints older than ``max_age_hours`` are ignored.
+    """
+
+    def __init__(self, name: str = 'full_catalog', max_age_hours: float = None):
+        self.name = name
+        self.max_age_hours = max_age_hours or float(os.getenv('SCRAPER_CHECKPOINT_MAX_AGE_HOURS', '24'))
+        self.watermark = 0
+        self._pending = collections.deque()
+        self._finished = set()
+
+    def load(self) -> int:
+        db = SessionLocal()
+        try:
+            checkpoint = get_checkpoint(db, self.name)
+        finally:
+            db.close()
+        if checkpoint and checkpoint.updated_at:
+            age = datetime.datetime.utcnow() - checkpoint.updated_at
+            if age <= datetime.timedelta(hours=self.max_age_hours):
+                self.watermark = checkpoint.last_product_id or 0
+            else:
+                print(f"Ignoring checkpoint '{self.name}' last updated {age} ago")
+        return self.watermark
+
+    def track(self, products):
+        for product_id, product_name in products:
+            self._pending.append(product_id)
+            yield product_id, product_name
+
+    def advance(self, product_ids):
+        self._finished.update(product_ids)
+        watermark = self.watermark
+        while self._pending and self._pending[0] in self._finished:
+            watermark = self._pending.popleft()
+            self._finished.discard(watermark)
+        if watermark != self.watermark:
+            self.watermark = watermark
+            db = SessionLocal()
+            try:
+                save_checkpoint(db, self.name, watermark)
+            finally:
+                db.close()
+
+    def clear(self):
+        db = SessionLocal()
+        try:
+            delete_checkpoint(db, self.name)
+        finally:
+            db.close()
+        self.watermark = 0
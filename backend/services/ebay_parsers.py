@@ -0,0 +1,121 @@
+import os
+import re
+
+from bs4 import BeautifulSoup
+
+try:
+    from lxml import etree, html as lxml_html
+    LXML_AVAILABLE = True
+except ImportError:
+    LXML_AVAILABLE = False
+
+# Shared by every backend so they only differ in how they walk the page
+PRICE_ITEM_CLASS = 's-item__info clearfix'
+PRICE_SPAN_CLASS = 's-item__price'
+COUNT_DIV_CLASS = 'srp-controls__control srp-controls__count'
+COUNT_HEADING_CLASS = 'srp-controls__count-heading'
+
+
+def clean_price(text):
+    price_str = text.replace('$', '').replace(',', '').strip()  # Clean price string
+    try:
+        return float(price_str)
+    except ValueError:
+        return None
+
+
+def clean_count(text):
+    # Keep only the digits and the trailing '+' of e.g. "1,234+ results for ..."
+    cleaned_text = text.replace('results for', '').strip()
+    return ''.join(char for char in cleaned_text if char.isdigit() or char == '+')
+
+
+_COUNT_HEADING_RE = re.compile(rf'class="{COUNT_HEADING_CLASS}"[^>]*>(.*?)</h1>', re.S)
+_TAG_RE = re.compile(r'<[^>]+>')
+_LEADING_NUMBER_RE = re.compile(r'\d[\d,]*')
+
+
+def parse_result_count(html_content):
+    """Total results eBay reports for the search (across all pages), or None.
+
+    A regex rather than a parse, so the scraper can decide which further
+    pages to request before the page itself has been parsed.
+    """
+    match = _COUNT_HEADING_RE.search(html_content)
+    if not match:
+        return None
+    # Only the leading number: the rest of the heading repeats the query, which may hold digits
+    number = _LEADING_NUMBER_RE.search(_TAG_RE.sub('', match.group(1)))
+    return int(number.group().replace(',', '')) if number else None
+
+
+def parse_with_soup(html_content):
+    """Reference parser: full BeautifulSoup tree built with html.parser."""
+    soup = BeautifulSoup(html_content, 'html.parser')
+
+    prices = []
+    for item in soup.find_all('div', {'class': PRICE_ITEM_CLASS}):  # Div with price info
+        price_text = item.find('span', {'class': PRICE_SPAN_CLASS})  # Span with item price
+        if price_text:
+            price = clean_price(price_text.text)
+            if price is not None:
+                prices.append(price)
+
+    listings = []
+    for listing in soup.find_all('div', {'class': COUNT_DIV_CLASS}):  # Div with listing info
+        listing_text = listing.find('h1', {'class': COUNT_HEADING_CLASS})  # H1 with listing amount
+        if listing_text:
+            listings.append(clean_count(listing_text.text))
+
+    return prices, listings
+
+
+def _has_class(name):
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+
+if LXML_AVAILABLE:
+    # Same matching rules as the soup parser: the container div must carry exactly
+    # that class attribute, the span/h1 is the first descendant with the class.
+    _PRICE_XPATH = etree.XPath(f"//div[normalize-space(@class)='{PRICE_ITEM_CLASS}']")
+    _PRICE_SPAN_XPATH = etree.XPath(f"(.//span[{_has_class(PRICE_SPAN_CLASS)}])[1]")
+    _COUNT_XPATH = etree.XPath(f"//div[normalize-space(@class)='{COUNT_DIV_CLASS}']")
+    _COUNT_HEADING_XPATH = etree.XPath(f"(.//h1[{_has_class(COUNT_HEADING_CLASS)}])[1]")
+
+
+def parse_with_lxml(html_content):
+    """Fast path: libxml2 parser and XPath lookups for just the price spans and count heading."""
+    try:
+        tree = lxml_html.fromstring(html_content)
+    except (etree.ParserError, ValueError):
+        # Empty or markup-free documents
+        return [], []
+
+    prices = []
+    for item in _PRICE_XPATH(tree):
+        price_text = _PRICE_SPAN_XPATH(item)
+        if price_text:
+            price = clean_price(price_text[0].text_content())
+            if price is not None:
+                prices.append(price)
+
+    listings = []
+    for listing in _COUNT_XPATH(tree):
+        listing_text = _COUNT_HEADING_XPATH(listing)
+        if listing_text:
+            listings.append(clean_count(listing_text[0].text_content()))
+
+    return prices, listings
+
+
+PARSER_BACKENDS = {'soup': parse_with_soup}
+if LXML_AVAILABLE:
+    PARSER_BACKENDS['lxml'] = parse_with_lxml
+
+
+def get_parser(name=None):
+    """Return the eBay results parser named ``name``, defaulting to SCRAPER_PARSER or the fastest available."""
+    name = name or os.getenv('SCRAPER_PARSER') or ('lxml' if LXML_AVAILABLE else 'soup')
+    if name not in PARSER_BACKENDS:
+        raise ValueError(f"Unknown or unavailable parser backend: {name}")
+    return PARSER_BACKENDS[name]
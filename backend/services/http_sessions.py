@@ -0,0 +1,93 @@
+import os
+import threading
+from urllib.parse import urlsplit
+
+import httpx
+
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+
+def default_timeout():
+    read_timeout = float(os.getenv('SCRAPER_TIMEOUT', '10'))
+    return httpx.Timeout(read_timeout, connect=float(os.getenv('SCRAPER_CONNECT_TIMEOUT', '5')))
+
+
+class HttpSessions:
+    """Long-lived, pooled HTTP clients shared by every request of a scrape run.
+
+    One client is kept per (upstream host, proxy) pair so connections through
+    a proxy stay alive between products instead of redoing the TCP and TLS
+    handshake on every call. HTTP/2 is used when the ``h2`` package is
+    installed. Sync clients are closed with ``close``, async ones with
+    ``aclose`` since they belong to the event loop that created them.
+    Clients may be requested from several threads at once.
+    """
+
+    def __init__(self, timeout: httpx.Timeout = None, max_connections: int = None, keepalive_expiry: float = 60.0):
+        self.timeout = timeout or default_timeout()
+        max_connections = max_connections or int(os.getenv('SCRAPER_MAX_CONNECTIONS', '20'))
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self._clients = {}
+        self._async_clients = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(url, proxy):
+        parts = urlsplit(url)
+        return f"{parts.scheme}://{parts.netloc}", proxy
+
+    def client(self, url, proxy=None) -> httpx.Client:
+        key = self._key(url, proxy)
+        client = self._clients.get(key)
+        if client is None:
+            with self._lock:
+                client = self._clients.get(key)
+                if client is None:
+                    client = self._clients[key] = httpx.Client(
+                        proxy=proxy, timeout=self.timeout, limits=self.limits, http2=HTTP2_AVAILABLE
+                    )
+        return client
+
+    def async_client(self, url, proxy=None) -> httpx.AsyncClient:
+        key = self._key(url, proxy)
+        client = self._async_clients.get(key)
+        if client is None:
+            with self._lock:
+                client = self._async_clients.get(key)
+                if client is None:
+                    client = self._async_clients[key] = httpx.AsyncClient(
+                        proxy=proxy, timeout=self.timeout, limits=self.limits, http2=HTTP2_AVAILABLE
+                    )
+        return client
+
+    def get(self, url, proxy=None, **kwargs) -> httpx.Response:
+        return self.client(url, proxy).get(url, **kwargs)
+
+    async def aget(self, url, proxy=None, **kwargs) -> httpx.Response:
+        return await self.async_client(url, proxy).get(url, **kwargs)
+
+    def close(self):
+        with self._lock:
+            clients, self._clients = self._clients, {}
+        for client in clients.values():
+            client.close()
+
+    async def aclose(self):
+        with self._lock:
+            clients, self._async_clients = self._async_clients, {}
+        for client in clients.values():
+            await client.aclose()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
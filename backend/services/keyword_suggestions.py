@@ -0,0 +1,86 @@
+import collections
+import os
+import threading
+import time
+import xml.etree.ElementTree as ET
+from typing import Optional
+from urllib.parse import quote_plus
+
+
+DEFAULT_KEYWORD_SUGGEST_URL = 'https://clients1.google.com/complete/search'
+
+
+def keyword_suggestions_url(query: str) -> str:
+    base_url = os.getenv('KEYWORD_SUGGEST_URL', DEFAULT_KEYWORD_SUGGEST_URL)
+    return f"{base_url}?hl=en&output=toolbar&q={quote_plus(query)}"
+
+
+def parse_suggestions(xml_text) -> Optional[list]:
+    """Suggestions from a Google suggest toolbar response, or None if it doesn't parse."""
+    try:
+        root = ET.fromstring(xml_text)
+    except ET.ParseError:
+        print("Error parsing XML response")
+        return None
+    return [suggestion.attrib['data'] for suggestion in root.findall(".//suggestion")]
+
+
+def normalize_query(query: str) -> str:
+    return ' '.join(query.lower().split())
+
+
+class KeywordSuggestionCache:
+    """Bounded LRU + TTL cache of suggestion lists, shared by every scrape in a process.
+
+    get only answers the exact query that was stored, since its list is what
+    gets saved as a product's popular keywords.
+    """
+
+    def __init__(self, max_entries: int = None, ttl: float = None):
+        self.max_entries = max_entries or int(os.getenv('KEYWORD_CACHE_SIZE', '10000'))
+        self.ttl = ttl or float(os.getenv('KEYWORD_CACHE_TTL', '86400'))
+        self._entries = collections.OrderedDict()  # query -> (stored_at, suggestions)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, query: str) -> Optional[list]:
+        key = normalize_query(query)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and time.monotonic() - entry[0] <= self.ttl:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def set(self, query: str, suggestions: list):
+        key = normalize_query(query)
+        with self._lock:
+            self._entries[key] = (time.monotonic(), suggestions)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 3) if lookups else None,
+        }
+
+
+_shared_cache = None
+
+
+def get_keyword_cache() -> KeywordSuggestionCache:
+    """The process-wide cache, so worker jobs and scheduler ticks share it."""
+    global _shared_cache
+    if _shared_cache is None:
+        _shared_cache = KeywordSuggestionCache()
+    return _shared_cache
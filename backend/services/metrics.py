@@ -0,0 +1,101 @@
+"""Prometheus metrics for the scraper and the API.
+
+Scrapes run in the worker process while ``/metrics`` is served by the web
+process. When both run on one host, set PROMETHEUS_MULTIPROC_DIR to the
+same empty directory for every process and ``/metrics`` reports them all.
+Otherwise set WORKER_METRICS_PORT to have each worker serve its own metrics.
+"""
+import os
+import time
+
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess
+
+# Upstream calls run from ~50ms (cache-warm API) to tens of seconds (slow proxy)
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60)
+
+UPSTREAM_REQUEST_SECONDS = Histogram(
+    'scraper_upstream_request_seconds',
+    'Latency of requests to eBay, the search volume API and Google suggest',
+    ['upstream', 'outcome'],
+    buckets=LATENCY_BUCKETS,
+)
+UPSTREAM_RETRIES = Counter('scraper_upstream_retries_total', 'Upstream requests retried after a failure', ['upstream'])
+PROXY_FAILURES = Counter('scraper_proxy_failures_total', 'Requests that failed on a proxy', ['reason'])
+# Per-proxy health, updated as requests finish so bans and cool-downs show up mid-run
+PROXY_REQUESTS = Counter('scraper_proxy_requests_total', 'Requests sent through each proxy', ['proxy', 'outcome'])
+PROXY_COOLDOWN_UNTIL = Gauge(
+    'scraper_proxy_cooldown_until_timestamp_seconds',
+    'Unix time at which the proxy leaves its cool-down; in the past when it is available',
+    ['proxy'],
+    multiprocess_mode='livemax',
+)
+PROXY_LATENCY = Gauge(
+    'scraper_proxy_latency_seconds', 'Moving average latency of successful requests through the proxy', ['proxy'],
+    multiprocess_mode='livemax',
+)
+CACHE_LOOKUPS = Counter('scraper_cache_lookups_total', 'Response cache lookups', ['source', 'result'])
+PARSE_SECONDS = Histogram(
+    'scraper_parse_seconds',
+    'Time to parse one eBay results page',
+    ['parser'],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1),
+)
+DB_WRITE_SECONDS = Histogram(
+    'scraper_db_write_seconds',
+    'Time to write one batch of scraped products',
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5),
+)
+DB_ROWS_WRITTEN = Counter('scraper_db_rows_written_total', 'Product rows updated by the scraper')
+PIPELINE_STAGE_ITEMS = Counter('scraper_pipeline_stage_items_total', 'Items handled by each pipeline stage', ['stage', 'outcome'])
+PIPELINE_STAGE_SECONDS = Histogram(
+    'scraper_pipeline_stage_seconds',
+    'Time a pipeline stage spent on one item',
+    ['stage'],
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+PIPELINE_QUEUE_DEPTH = Gauge(
+    'scraper_pipeline_queue_depth', 'Items waiting in front of each pipeline stage', ['stage'], multiprocess_mode='livesum'
+)
+PRODUCTS_COMPLETED = Counter('scraper_products_total', 'Products handled by the scraper', ['engine', 'outcome'])
+PRODUCT_SECONDS = Histogram(
+    'scraper_product_seconds',
+    'Time from picking a product up to queueing its data for writing',
+    ['engine'],
+    buckets=LATENCY_BUCKETS,
+)
+# bcrypt at the default cost takes a few hundred ms per operation
+PASSWORD_HASH_SECONDS = Histogram(
+    'password_hash_seconds',
+    'Time to hash or verify one password in the hashing pool',
+    ['operation'],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5),
+)
+PASSWORD_HASH_QUEUE_SECONDS = Histogram(
+    'password_hash_queue_seconds',
+    'Time a password operation waited for a free hashing process',
+    ['operation'],
+    buckets=(0.001, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+PASSWORD_HASH_REJECTED = Counter(
+    'password_hash_rejected_total', 'Password operations turned away because the hashing queue was full', ['operation']
+)
+HTTP_REQUEST_SECONDS = Histogram(
+    'http_request_duration_seconds',
+    'API request latency',
+    ['method', 'route', 'status'],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+
+
+def observe_upstream(upstream: str, started: float, outcome: str = 'ok'):
+    """Record one upstream request that began at time.monotonic() == started."""
+    UPSTREAM_REQUEST_SECONDS.labels(upstream, outcome).observe(time.monotonic() - started)
+
+
+def render_metrics():
+    """(body, content_type) for a /metrics response."""
+    if os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(), CONTENT_TYPE_LATEST
@@ -0,0 +1,91 @@
+import asyncio
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from passlib.context import CryptContext
+
+from .metrics import PASSWORD_HASH_QUEUE_SECONDS, PASSWORD_HASH_REJECTED, PASSWORD_HASH_SECONDS
+
+# The rounds are set explicitly (12 is passlib's default) so that
+# verify_and_update flags hashes made with any other cost, higher or lower
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__rounds=int(os.getenv('PASSWORD_BCRYPT_ROUNDS', '12')),
+)
+
+
+class PasswordHashingBusy(Exception):
+    """Raised instead of queueing when the hashing pool's queue is full."""
+
+
+def _timed_hash(password):
+    started = time.perf_counter()
+    return pwd_context.hash(password), time.perf_counter() - started
+
+
+def _timed_verify_and_update(password, hashed_password):
+    started = time.perf_counter()
+    return pwd_context.verify_and_update(password, hashed_password), time.perf_counter() - started
+
+
+class PasswordHasher:
+    """bcrypt on a process pool of its own, so logins can't starve the API's threads.
+
+    Uses PASSWORD_HASH_WORKERS processes (default: one per core). At most
+    PASSWORD_HASH_QUEUE operations wait for a free process on top of the
+    running ones; past that, calls raise PasswordHashingBusy at once rather
+    than making every login slower. Call it from the event loop only.
+    """
+
+    def __init__(self, workers: int = None, max_queued: int = None):
+        self.workers = workers or int(os.getenv('PASSWORD_HASH_WORKERS', str(os.cpu_count() or 1)))
+        self.max_queued = max_queued if max_queued is not None else int(os.getenv('PASSWORD_HASH_QUEUE', str(self.workers * 4)))
+        self.in_flight = 0
+        self._executor = None
+
+    def _submit(self, operation, function, *args):
+        if self.in_flight >= self.workers + self.max_queued:
+            PASSWORD_HASH_REJECTED.labels(operation).inc()
+            raise PasswordHashingBusy(f"{self.in_flight} password operations already running or queued")
+        if self._executor is None:
+            # spawn: forking the API process would copy its threads' locks
+            self._executor = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context('spawn'))
+        return asyncio.get_running_loop().run_in_executor(self._executor, function, *args)
+
+    async def _run(self, operation, function, *args):
+        started = time.perf_counter()
+        future = self._submit(operation, function, *args)
+        self.in_flight += 1
+        try:
+            result, seconds = await future
+        finally:
+            self.in_flight -= 1
+        PASSWORD_HASH_SECONDS.labels(operation).observe(seconds)
+        PASSWORD_HASH_QUEUE_SECONDS.labels(operation).observe(max(0.0, time.perf_counter() - started - seconds))
+        return result
+
+    async def hash(self, password: str) -> str:
+        return await self._run('hash', _timed_hash, password)
+
+    async def verify_and_update(self, password: str, hashed_password: str):
+        """(valid, new_hash): new_hash is set when the stored hash uses other cost settings."""
+        return await self._run('verify', _timed_verify_and_update, password, hashed_password)
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+_shared_hasher = None
+
+
+def get_password_hasher() -> PasswordHasher:
+    """The process-wide hasher, so every request shares one bounded pool."""
+    global _shared_hasher
+    if _shared_hasher is None:
+        _shared_hasher = PasswordHasher()
+    return _shared_hasher
@@ -0,0 +1,192 @@
+import asyncio
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from .async_scraper import AsyncMarketplaceScraper
+from .metrics import PARSE_SECONDS, PIPELINE_QUEUE_DEPTH, PIPELINE_STAGE_ITEMS, PIPELINE_STAGE_SECONDS
+from .product_writer import BulkProductWriter
+
+_DONE = object()  # end-of-stream marker passed between stages
+
+
+class StageStats:
+    """Per-stage counts for the run summary, mirrored to Prometheus as items finish."""
+
+    def __init__(self, name, queue: asyncio.Queue):
+        self.name = name
+        self.queue = queue
+        self.processed = 0
+        self.failed = 0
+        self.busy_seconds = 0.0
+        self.started_at = time.monotonic()
+
+    def record(self, seconds, failed=False):
+        self.processed += 1
+        self.busy_seconds += seconds
+        if failed:
+            self.failed += 1
+        PIPELINE_STAGE_ITEMS.labels(self.name, 'failed' if failed else 'ok').inc()
+        PIPELINE_STAGE_SECONDS.labels(self.name).observe(seconds)
+        self.export_queue_depth()
+
+    def export_queue_depth(self):
+        PIPELINE_QUEUE_DEPTH.labels(self.name).set(self.queue.qsize())
+
+    def snapshot(self) -> dict:
+        elapsed = max(time.monotonic() - self.started_at, 1e-9)
+        return {
+            'stage': self.name,
+            'queue_depth': self.queue.qsize(),
+            'processed': self.processed,
+            'failed': self.failed,
+            'throughput_per_s': round(self.processed / elapsed, 2),
+            'avg_ms': round(1000 * self.busy_seconds / self.processed, 1) if self.processed else None,
+        }
+
+
+class PipelineMarketplaceScraper(AsyncMarketplaceScraper):
+    """Runs a scrape as fetch -> parse -> aggregate -> write stages.
+
+    Stages are connected by bounded queues so a slow stage applies
+    backpressure instead of buffering the catalog in memory. Fetching uses
+    the async engine's concurrency limits, and parsing runs in a process
+    pool so it scales across cores while network I/O carries on.
+    """
+
+    engine = 'pipeline'
+
+    def __init__(self, parse_processes: int = None, queue_size: int = None, report_interval: float = None, **kwargs):
+        super().__init__(**kwargs)
+        self.parse_processes = parse_processes or int(os.getenv('SCRAPER_PARSE_PROCESSES', str(os.cpu_count() or 1)))
+        self.queue_size = queue_size or int(os.getenv('SCRAPER_QUEUE_SIZE', str(2 * self.max_concurrency)))
+        self.report_interval = report_interval or float(os.getenv('SCRAPER_PIPELINE_REPORT_SECONDS', '30'))
+        self.stages = []
+
+    async def _fetch(self, item):
+        product_id, product_name = item
+        self.product_started(product_id)
+        ebay_url = self.generate_url(product_name)
+        print(f"Scraping eBay URL: {ebay_url}")
+        pages, search_volume_us, search_volume_au, search_volume_uk, popular_keywords = await self.gather_product_requests(
+            self.fetch_ebay_pages_async(product_name),
+            self.search_volume_async(product_name, 'us'),
+            self.search_volume_async(product_name, 'au'),
+            self.search_volume_async(product_name, 'gb'),
+            self.fetch_popular_keywords_async(product_name),
+        )
+        return product_id, pages, (search_volume_us, search_volume_au, search_volume_uk, popular_keywords)
+
+    async def _parse(self, item, executor):
+        product_id, pages, extras = item
+        if not pages:
+            return product_id, ([], []), extras
+        loop = asyncio.get_running_loop()
+
+        async def parse_page(html):
+            started = time.perf_counter()
+            # self.parser is a module-level function, so it pickles into the worker processes
+            parsed = await loop.run_in_executor(executor, self.parser, html)
+            # Includes waiting for a free parse process
+            PARSE_SECONDS.labels(self.parser.__name__).observe(time.perf_counter() - started)
+            return parsed
+
+        parsed = await asyncio.gather(*(parse_page(html) for html in pages))
+        return product_id, self.merge_ebay_pages(parsed), extras
+
+    async def _aggregate(self, item):
+        product_id, (ebay_prices, ebay_listings), (search_volume_us, search_volume_au, search_volume_uk, popular_keywords) = item
+        return product_id, self.build_product_data(
+            ebay_prices, ebay_listings, search_volume_us, search_volume_au, search_volume_uk, popular_keywords
+        )
+
+    async def _run_stage(self, stats, handler, workers, outbox=None, downstream_workers=1, on_error=None):
+        async def worker():
+            while True:
+                item = await stats.queue.get()
+                if item is _DONE:
+                    return
+                started = time.perf_counter()
+                try:
+                    result = await handler(item)
+                except Exception as e:
+                    stats.record(time.perf_counter() - started, failed=True)
+                    print(f"{stats.name} stage failed for product ID '{item[0]}': {e}")
+                    if on_error:
+                        await on_error(item[0])
+                    continue
+                stats.record(time.perf_counter() - started)
+                if outbox is not None:
+                    await outbox.put(result)
+
+        await asyncio.gather(*(worker() for _ in range(workers)))
+        if outbox is not None:
+            for _ in range(downstream_workers):
+                await outbox.put(_DONE)
+
+    async def _report(self):
+        while True:
+            await asyncio.sleep(self.report_interval)
+            print(f"Pipeline stats: {self.pipeline_stats()}")
+
+    def pipeline_stats(self):
+        return [stats.snapshot() for stats in self.stages]
+
+    async def scrape_products_async(self, product_list, collect_results=True, on_flush=None):
+        results = {}
+        self._request_slots = asyncio.Semaphore(self.max_concurrency)
+        fetch_workers = self.max_concurrency
+        parse_workers = self.parse_processes
+
+        fetch_queue = asyncio.Queue(self.queue_size)
+        parse_queue = asyncio.Queue(self.queue_size)
+        aggregate_queue = asyncio.Queue(self.queue_size)
+        write_queue = asyncio.Queue(self.queue_size)
+        fetch_stats = StageStats('fetch', fetch_queue)
+        parse_stats = StageStats('parse', parse_queue)
+        aggregate_stats = StageStats('aggregate', aggregate_queue)
+        write_stats = StageStats('write', write_queue)
+        self.stages = [fetch_stats, parse_stats, aggregate_stats, write_stats]
+
+        writer = BulkProductWriter(on_flush=on_flush)
+
+        async def write(item):
+            product_id, product_data = item
+            print(f"Queueing update for product ID '{product_id}' with data: {product_data}")
+            # Flushes hit the database, keep them off the event loop
+            await asyncio.to_thread(writer.add, product_id, product_data)
+            self.product_finished(product_id)
+            if collect_results:
+                results[product_id] = product_data
+
+        async def failed(product_id):
+            # Same thread path as writer.add, the writer's lock may be held by a flush
+            await asyncio.to_thread(writer.mark_failed, product_id)
+            self.product_finished(product_id, ok=False)
+
+        # spawn rather than fork: we may be running inside a threaded web worker
+        executor = ProcessPoolExecutor(self.parse_processes, mp_context=multiprocessing.get_context('spawn'))
+        reporter = asyncio.create_task(self._report())
+        try:
+            await asyncio.gather(
+                self.feed_with_search_volumes(product_list, fetch_queue, _DONE, fetch_workers),
+                self._run_stage(fetch_stats, self._fetch, fetch_workers, parse_queue, parse_workers, failed),
+                self._run_stage(
+                    parse_stats, lambda item: self._parse(item, executor), parse_workers, aggregate_queue, 1, failed
+                ),
+                self._run_stage(aggregate_stats, self._aggregate, 1, write_queue, 1, failed),
+                self._run_stage(write_stats, write, 1, on_error=failed),
+            )
+        finally:
+            reporter.cancel()
+            for stats in self.stages:
+                stats.export_queue_depth()
+            executor.shutdown(wait=False, cancel_futures=True)
+            await asyncio.to_thread(writer.close)
+            await self.sessions.aclose()
+        print(f"Pipeline stats: {self.pipeline_stats()}")
+        print(f"Proxy pool stats: {self.proxies.stats()}")
+        print(f"Response cache stats: {self.cache.stats()}")
+        print(f"Keyword cache stats: {self.keyword_cache.stats()}")
+        return results if collect_results else {'products_scraped': write_stats.processed - write_stats.failed}
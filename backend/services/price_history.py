@@ -0,0 +1,125 @@
+import datetime
+
+from ..crud import get_product_daily_rollups, get_product_observations
+
+HISTORY_BUCKETS = ('raw', 'hour', 'day', 'week', 'month')
+
+# Metrics averaged over every observation in a bucket
+VOLUME_METRICS = {
+    'ebay_listings': 'listings_sum',
+    'ebay_sale_amount': 'sale_amount_sum',
+    'search_volume_us': 'search_volume_us_sum',
+    'search_volume_au': 'search_volume_au_sum',
+    'search_volume_uk': 'search_volume_uk_sum',
+}
+
+
+def choose_bucket(start: datetime.datetime, end: datetime.datetime) -> str:
+    """The finest bucket that keeps a range to a few hundred points."""
+    span = end - start
+    if span <= datetime.timedelta(days=2):
+        return 'raw'
+    if span <= datetime.timedelta(days=14):
+        return 'hour'
+    if span <= datetime.timedelta(days=366):
+        return 'day'
+    if span <= datetime.timedelta(days=3 * 366):
+        return 'week'
+    return 'month'
+
+
+def bucket_start(moment, bucket: str):
+    if bucket == 'hour':
+        return moment.replace(minute=0, second=0, microsecond=0)
+    day = moment.date() if isinstance(moment, datetime.datetime) else moment
+    if bucket == 'week':
+        return day - datetime.timedelta(days=day.weekday())
+    if bucket == 'month':
+        return day.replace(day=1)
+    return day
+
+
+class _Bucket:
+    """Running sums for one output point; fed either raw observations or daily rollups."""
+
+    def __init__(self, start):
+        self.start = start
+        self.samples = 0
+        self.priced_samples = 0
+        self.price_sum = 0.0
+        self.price_min = None
+        self.price_max = None
+        self.median_sum = 0.0
+        self.sums = dict.fromkeys(VOLUME_METRICS, 0)
+
+    def add_rollup(self, rollup):
+        self.samples += rollup.samples
+        self.priced_samples += rollup.priced_samples
+        self.price_sum += rollup.price_sum
+        self.median_sum += rollup.median_sum
+        self._extend_range(rollup.price_min, rollup.price_max)
+        for metric, column in VOLUME_METRICS.items():
+            self.sums[metric] += getattr(rollup, column) or 0
+
+    def add_observation(self, observation):
+        self.samples += 1
+        if observation.average_ebay_price is not None:
+            self.priced_samples += 1
+            self.price_sum += observation.average_ebay_price
+            self.median_sum += observation.ebay_price_median or observation.average_ebay_price
+            self._extend_range(observation.average_ebay_price, observation.average_ebay_price)
+        for metric in VOLUME_METRICS:
+            self.sums[metric] += getattr(observation, metric) or 0
+
+    def _extend_range(self, low, high):
+        if low is not None and (self.price_min is None or low < self.price_min):
+            self.price_min = low
+        if high is not None and (self.price_max is None or high > self.price_max):
+            self.price_max = high
+
+    def point(self) -> dict:
+        priced = self.priced_samples
+        return {
+            't': self.start.isoformat(),
+            'samples': self.samples,
+            'average_ebay_price': round(self.price_sum / priced, 2) if priced else None,
+            'ebay_price_median': round(self.median_sum / priced, 2) if priced else None,
+            'price_min': self.price_min,
+            'price_max': self.price_max,
+            **{metric: round(total / self.samples, 2) for metric, total in self.sums.items()},
+        }
+
+
+def product_history(db, product_id: int, start: datetime.datetime, end: datetime.datetime, bucket: str = None) -> dict:
+    """Downsampled metric series for one product between start (inclusive) and end (exclusive).
+
+    Day, week and month buckets are built from the daily rollups, so their
+    cost depends on the number of days in the range rather than the number
+    of scrapes. Raw and hourly series read the observations themselves
+    through the (product_id, observed_at) index.
+    """
+    bucket = bucket or choose_bucket(start, end)
+    if bucket == 'raw':
+        points = []
+        for observation in get_product_observations(db, product_id, start, end):
+            single = _Bucket(observation.observed_at)
+            single.add_observation(observation)
+            points.append(single.point())
+        return {'product_id': product_id, 'bucket': bucket, 'points': points}
+
+    buckets = {}
+    if bucket == 'hour':
+        for observation in get_product_observations(db, product_id, start, end):
+            key = bucket_start(observation.observed_at, bucket)
+            buckets.setdefault(key, _Bucket(key)).add_observation(observation)
+    else:
+        # Rollups are whole days, so a partial first or last day counts in full
+        last_day = (end - datetime.timedelta(microseconds=1)).date()
+        for rollup in get_product_daily_rollups(db, product_id, start.date(), last_day):
+            key = bucket_start(rollup.day, bucket)
+            buckets.setdefault(key, _Bucket(key)).add_rollup(rollup)
+    return {
+        'product_id': product_id,
+        'bucket': bucket,
+        'points': [buckets[key].point() for key in sorted(buckets)],
+    }
@@ -0,0 +1,133 @@
+import json
+import os
+
+import numpy as np
+
+from ..crud import bulk_update_products, get_product_prices_after
+from ..database import SessionLocal
+
+PERCENTILES = (10, 25, 50, 75, 90)
+IQR_FENCE = 1.5  # Tukey fences: drop prices outside [q1 - 1.5 IQR, q3 + 1.5 IQR]
+TRIM_FRACTION = 0.1  # Trimmed mean ignores the lowest and highest 10% of the kept prices
+MIN_SAMPLES_FOR_FENCES = 4  # Quartiles of fewer prices don't say what an outlier is
+
+# Product column for each statistic, stored next to average_ebay_price
+STAT_COLUMNS = (
+    'ebay_price_median',
+    'ebay_price_trimmed_mean',
+    'ebay_price_p10',
+    'ebay_price_p25',
+    'ebay_price_p75',
+    'ebay_price_p90',
+    'ebay_price_count',
+    'ebay_price_outliers',
+)
+
+
+def _round(values):
+    return [None if np.isnan(value) else round(float(value), 2) for value in values]
+
+
+def _percentiles(ordered, counts, percentiles):
+    """Linear-interpolated percentiles of each row's first counts[i] values.
+
+    Rows must be sorted with NaN padding at the end. Same result as
+    np.nanpercentile(axis=1), but without its per-row Python loop.
+    """
+    rows = np.arange(len(ordered))[:, None]
+    positions = np.maximum(counts - 1, 0)[:, None] * (np.asarray(percentiles) / 100)
+    below = np.floor(positions).astype(int)
+    above = np.minimum(below + 1, np.maximum(counts - 1, 0)[:, None])
+    weight = positions - below
+    values = ordered[rows, below] * (1 - weight) + ordered[rows, above] * weight
+    values[counts == 0] = np.nan
+    return values.T
+
+
+def batch_price_stats(price_lists) -> list:
+    """Robust statistics for many products' sold prices at once.
+
+    The price lists are packed into one NaN-padded matrix, so every step
+    (quartiles, outlier fences, percentiles, trimmed mean) is a single
+    NumPy operation over all products rather than a Python loop. Returns
+    one dict per input list, keyed by STAT_COLUMNS.
+    """
+    if not price_lists:
+        return []
+    width = max(1, max(len(prices) for prices in price_lists))
+    matrix = np.full((len(price_lists), width), np.nan)
+    for row, prices in enumerate(price_lists):
+        matrix[row, :len(prices)] = prices
+    # Non-positive prices are parsing noise (e.g. "$0.00" placeholders)
+    with np.errstate(invalid='ignore'):
+        matrix[matrix <= 0] = np.nan
+    # Sorting pushes NaN to the end of each row, so row i's prices are ordered[i, :samples[i]]
+    ordered = np.sort(matrix, axis=1)
+    samples = np.count_nonzero(~np.isnan(ordered), axis=1)
+
+    q1, q3 = _percentiles(ordered, samples, (25, 75))
+    iqr = q3 - q1
+    fenced = samples >= MIN_SAMPLES_FOR_FENCES
+    low = np.where(fenced, q1 - IQR_FENCE * iqr, -np.inf)
+    high = np.where(fenced, q3 + IQR_FENCE * iqr, np.inf)
+    with np.errstate(invalid='ignore'):
+        outliers = (ordered < low[:, None]) | (ordered > high[:, None])
+    # Outliers sit at either end of a sorted row, so re-sorting keeps the NaN-last layout
+    kept = np.sort(np.where(outliers, np.nan, ordered), axis=1)
+    counts = np.count_nonzero(~np.isnan(kept), axis=1)
+
+    p10, p25, median, p75, p90 = _percentiles(kept, counts, PERCENTILES)
+
+    # The trimmed slice kept[i, trim:counts - trim] is a difference of cumulative sums
+    cumulative = np.concatenate(
+        [np.zeros((len(price_lists), 1)), np.cumsum(np.nan_to_num(kept), axis=1)], axis=1
+    )
+    trim = np.floor(counts * TRIM_FRACTION).astype(int)
+    start, stop = trim, counts - trim
+    rows = np.arange(len(price_lists))
+    trimmed_mean = (cumulative[rows, stop] - cumulative[rows, start]) / np.maximum(stop - start, 1)
+    trimmed_mean[counts == 0] = np.nan
+
+    columns = zip(
+        _round(median), _round(trimmed_mean), _round(p10), _round(p25), _round(p75), _round(p90),
+        counts.tolist(), (samples - counts).tolist(),
+    )
+    return [dict(zip(STAT_COLUMNS, values)) for values in columns]
+
+
+def price_stats(prices) -> dict:
+    """Robust statistics for one product's sold prices."""
+    return batch_price_stats([prices])[0]
+
+
+def recompute_catalog_price_stats(chunk_size: int = None) -> int:
+    """Recompute the stored statistics for every product from its saved sold prices.
+
+    Walks the catalog in keyset chunks, computes each chunk in one batch and
+    writes it back with a bulk UPDATE. Returns the number of products updated.
+    """
+    chunk_size = chunk_size or int(os.getenv('PRICE_STATS_CHUNK', '1000'))
+    last_id = 0
+    updated = 0
+    while True:
+        db = SessionLocal()
+        try:
+            chunk = get_product_prices_after(db, last_id, chunk_size)
+            if not chunk:
+                return updated
+            price_lists = []
+            for _, ebay_prices in chunk:
+                try:
+                    price_lists.append([float(price) for price in json.loads(ebay_prices or '[]')])
+                except (TypeError, ValueError):
+                    price_lists.append([])
+            stats = batch_price_stats(price_lists)
+            updated += bulk_update_products(db, {product_id: row for (product_id, _), row in zip(chunk, stats)})
+        finally:
+            db.close()
+        last_id = chunk[-1][0]
+        print(f"Recomputed price statistics for {updated} products")
+
+
+if __name__ == "__main__":
+    recompute_catalog_price_stats()
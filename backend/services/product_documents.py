@@ -0,0 +1,58 @@
+import json
+import math
+
+
+def _parse_json(value, default):
+    # Columns holding JSON text; anything unreadable falls back to default
+    if value is None:
+        return default
+    if not isinstance(value, str):
+        return value
+    try:
+        return json.loads(value)
+    except json.JSONDecodeError:
+        return default
+
+
+def _number(value):
+    # NaN and infinities are not JSON
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    return value
+
+
+def product_document(product) -> bytes:
+    """The JSON the API serves for product, encoded once when the product is written.
+
+    Same fields and defaults as ProductResponse in main.py. Built without
+    validation, so a malformed stored value can't make a write fail.
+    """
+    keywords = _parse_json(product.popular_keywords, [])
+    document = {
+        "id": product.id,
+        "name": product.name,
+        "image_url": product.image_url,
+        "average_ebay_price": _number(product.average_ebay_price) or 0.0,
+        "ebay_price_median": _number(product.ebay_price_median),
+        "ebay_price_trimmed_mean": _number(product.ebay_price_trimmed_mean),
+        "ebay_price_p10": _number(product.ebay_price_p10),
+        "ebay_price_p25": _number(product.ebay_price_p25),
+        "ebay_price_p75": _number(product.ebay_price_p75),
+        "ebay_price_p90": _number(product.ebay_price_p90),
+        "ebay_price_count": product.ebay_price_count,
+        "ebay_price_outliers": product.ebay_price_outliers,
+        "ebay_listings": product.ebay_listings or 0,
+        "ebay_sale_amount": _number(product.ebay_sale_amount) or 0.0,
+        "search_volume_us": product.search_volume_us or "0",
+        "search_volume_au": product.search_volume_au or "0",
+        "search_volume_uk": product.search_volume_uk or "0",
+        "popular_keywords": keywords if isinstance(keywords, list) else [],
+        "vendor": _parse_json(product.vendor, None) or None,
+        "last_updated": product.last_updated or None,
+    }
+    return json.dumps(document, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+def document_list(documents) -> bytes:
+    """A JSON array of already-encoded documents."""
+    return b"[" + b",".join(documents) + b"]"
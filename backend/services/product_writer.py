@@ -0,0 +1,85 @@
+import os
+import threading
+import time
+
+from ..crud import write_scraped_products
+from ..database import SessionLocal
+from .metrics import DB_ROWS_WRITTEN, DB_WRITE_SECONDS
+
+
+class BulkProductWriter:
+    """Buffers scraped product_data and writes it in batches.
+
+    A batch is flushed in one transaction once it holds ``batch_size``
+    products or its oldest row has waited ``flush_interval`` seconds, so a
+    crash loses at most one batch. Use as a context manager to flush the
+    remainder at the end of a run. Every written product also gets a row in
+    the append-only price history. ``on_flush`` is called with the IDs of
+    every product handled by a flush, including ones marked as failed.
+    Safe to share between threads; a flush holds off other callers.
+    """
+
+    def __init__(self, batch_size: int = None, flush_interval: float = None, on_flush=None):
+        self.batch_size = batch_size or int(os.getenv('SCRAPER_WRITE_BATCH', '50'))
+        self.flush_interval = flush_interval or float(os.getenv('SCRAPER_WRITE_INTERVAL', '30'))
+        self.written = 0
+        self.skipped = 0
+        self.on_flush = on_flush
+        self._buffer = {}
+        self._failed = []
+        self._oldest = None
+        self._db = SessionLocal()
+        self._lock = threading.RLock()
+
+    def add(self, product_id, product_data):
+        with self._lock:
+            if not self._buffer:
+                self._oldest = time.monotonic()
+            self._buffer[product_id] = product_data
+            if len(self._buffer) >= self.batch_size or time.monotonic() - self._oldest >= self.flush_interval:
+                self.flush()
+
+    def mark_failed(self, product_id):
+        # Nothing to write, but the product still counts as handled for on_flush
+        with self._lock:
+            self._failed.append(product_id)
+
+    def flush(self):
+        with self._lock:
+            return self._flush()
+
+    def _flush(self):
+        if not self._buffer and not self._failed:
+            return 0
+        batch, self._buffer = self._buffer, {}
+        failed, self._failed = self._failed, []
+        started = time.perf_counter()
+        try:
+            updated = write_scraped_products(self._db, batch)
+        except Exception as e:
+            self._db.rollback()
+            print(f"Error writing batch of {len(batch)} products: {e}")
+            raise
+        if batch:
+            DB_WRITE_SECONDS.observe(time.perf_counter() - started)
+            DB_ROWS_WRITTEN.inc(updated)
+        self.written += updated
+        self.skipped += len(batch) - updated
+        if batch:
+            print(f"Wrote batch of {updated} products" + (f", {len(batch) - updated} no longer in the database" if updated < len(batch) else ""))
+        if self.on_flush:
+            self.on_flush(list(batch) + failed)
+        return updated
+
+    def close(self):
+        with self._lock:
+            try:
+                self._flush()
+            finally:
+                self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,181 @@
+import os
+import random
+import threading
+import time
+
+from .metrics import PROXY_COOLDOWN_UNTIL, PROXY_FAILURES, PROXY_LATENCY, PROXY_REQUESTS
+
+# Response markers that mean the upstream has flagged the proxy rather than the request
+BAN_STATUS_CODES = {403, 429}
+BAN_MARKERS = ("captcha", "pardon our interruption", "security measure", "unusual traffic")
+
+
+class ProxyBannedError(Exception):
+    def __init__(self, message, response=None):
+        super().__init__(message)
+        self.response = response  # kept so retries can honour its Retry-After
+
+
+class Proxy:
+    def __init__(self, raw: str):
+        username, password, ip, port = raw.split(':')
+        self.raw = raw
+        self.url = f"http://{username}:{password}@{ip}:{port}/"
+        self.label = f"{ip}:{port}"
+        self.successes = 0
+        self.failures = 0
+        self.bans = 0
+        self.consecutive_failures = 0
+        self.latency = None  # exponentially weighted average, seconds
+        self.cooldown_until = 0.0
+
+    @property
+    def success_rate(self) -> float:
+        total = self.successes + self.failures
+        # Untried proxies get a neutral rate so they still get picked
+        return self.successes / total if total else 0.5
+
+    def is_available(self, now: float) -> bool:
+        return self.cooldown_until <= now
+
+    def score(self) -> float:
+        latency = self.latency if self.latency is not None else 1.0
+        return (self.success_rate + 0.05) / (1.0 + latency)
+
+    def export(self, now: float):
+        """Publish the cool-down and latency gauges; now is time.monotonic()."""
+        PROXY_COOLDOWN_UNTIL.labels(self.label).set(time.time() + (self.cooldown_until - now))
+        if self.latency is not None:
+            PROXY_LATENCY.labels(self.label).set(self.latency)
+
+    def stats(self, now: float) -> dict:
+        return {
+            'proxy': self.label,
+            'successes': self.successes,
+            'failures': self.failures,
+            'bans': self.bans,
+            'success_rate': round(self.success_rate, 3),
+            'latency': round(self.latency, 3) if self.latency is not None else None,
+            'cooldown_remaining': round(max(0.0, self.cooldown_until - now), 1),
+        }
+
+
+class ProxyPool:
+    """Pool of ``user:pass:ip:port`` proxies ranked by health.
+
+    Proxies are picked with probability proportional to their score (success
+    rate over latency). A failing proxy is sidelined for ``base_cooldown``
+    seconds, doubling with each consecutive failure up to ``max_cooldown``;
+    ban signals (403, 429, captcha pages) start from ``ban_cooldown`` instead.
+    """
+
+    def __init__(self, proxies, base_cooldown: float = 5.0, ban_cooldown: float = 60.0, max_cooldown: float = 900.0):
+        self.proxies = []
+        for raw in proxies:
+            try:
+                self.proxies.append(Proxy(raw.strip()))
+            except ValueError:
+                print(f"Invalid proxy format: {raw}. Expected 'username:password:ip:port'.")
+        self.base_cooldown = base_cooldown
+        self.ban_cooldown = ban_cooldown
+        self.max_cooldown = max_cooldown
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls):
+        """Load proxies from PROXY_USERNAME/PASSWORD/IP/PORT, PROXY_LIST and PROXY_FILE."""
+        raw_proxies = []
+        username = os.getenv('PROXY_USERNAME')
+        password = os.getenv('PROXY_PASSWORD')
+        proxy_ip = os.getenv('PROXY_IP')
+        proxy_port = os.getenv('PROXY_PORT')
+        if all([username, password, proxy_ip, proxy_port]):
+            raw_proxies.append(f"{username}:{password}:{proxy_ip}:{proxy_port}")
+
+        # PROXY_LIST holds comma or newline separated proxies
+        proxy_list = os.getenv('PROXY_LIST', '')
+        raw_proxies.extend(p for p in proxy_list.replace(',', '\n').splitlines() if p.strip())
+
+        proxy_file = os.getenv('PROXY_FILE')
+        if proxy_file:
+            try:
+                with open(proxy_file) as f:
+                    raw_proxies.extend(line for line in f if line.strip() and not line.startswith('#'))
+            except OSError as e:
+                print(f"Error reading proxy file {proxy_file}: {e}")
+
+        # Drop duplicates while keeping order
+        return cls(dict.fromkeys(p.strip() for p in raw_proxies))
+
+    def __len__(self):
+        return len(self.proxies)
+
+    def acquire(self) -> Proxy:
+        """Pick a healthy proxy, or the one closest to the end of its cool-down."""
+        if not self.proxies:
+            raise ValueError("No proxies loaded. Please check your proxy file.")
+        now = time.monotonic()
+        with self._lock:
+            available = [p for p in self.proxies if p.is_available(now)]
+            if not available:
+                return min(self.proxies, key=lambda p: p.cooldown_until)
+            return random.choices(available, weights=[p.score() for p in available])[0]
+
+    def wait_time(self) -> float:
+        """Seconds until at least one proxy is out of cool-down."""
+        if not self.proxies:
+            return 0.0
+        now = time.monotonic()
+        return max(0.0, min(p.cooldown_until for p in self.proxies) - now)
+
+    def report_success(self, proxy: Proxy, latency: float):
+        PROXY_REQUESTS.labels(proxy.label, 'ok').inc()
+        now = time.monotonic()
+        with self._lock:
+            proxy.successes += 1
+            proxy.consecutive_failures = 0
+            proxy.cooldown_until = 0.0
+            proxy.latency = latency if proxy.latency is None else 0.8 * proxy.latency + 0.2 * latency
+            proxy.export(now)
+
+    def report_failure(self, proxy: Proxy, banned: bool = False):
+        PROXY_FAILURES.labels('banned' if banned else 'error').inc()
+        PROXY_REQUESTS.labels(proxy.label, 'banned' if banned else 'error').inc()
+        now = time.monotonic()
+        with self._lock:
+            proxy.failures += 1
+            proxy.consecutive_failures += 1
+            base = self.ban_cooldown if banned else self.base_cooldown
+            if banned:
+                proxy.bans += 1
+            cooldown = min(self.max_cooldown, base * 2 ** (proxy.consecutive_failures - 1))
+            # A plain failure must not shorten a ban cool-down that is still running
+            proxy.cooldown_until = max(proxy.cooldown_until, now + cooldown)
+            proxy.export(now)
+
+    @staticmethod
+    def is_ban(status_code: int, text: str = '') -> bool:
+        if status_code in BAN_STATUS_CODES:
+            return True
+        # Block pages announce themselves in the <title>; the body of a normal
+        # results page can mention "captcha" in inline scripts
+        lowered = text[:20000].lower()
+        start = lowered.find('<title')
+        if start == -1:
+            return False
+        title = lowered[start:lowered.find('</title>', start)]
+        return any(marker in title for marker in BAN_MARKERS)
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        with self._lock:
+            proxies = [p.stats(now) for p in self.proxies]
+            available = sum(1 for p in self.proxies if p.is_available(now))
+        return {
+            'total': len(proxies),
+            'available': available,
+            'successes': sum(p['successes'] for p in proxies),
+            'failures': sum(p['failures'] for p in proxies),
+            'bans': sum(p['bans'] for p in proxies),
+            'proxies': proxies,
+        }
@@ -0,0 +1,137 @@
+import datetime
+import email.utils
+import os
+import random
+import threading
+import time
+from urllib.parse import urlsplit
+
+
+def parse_retry_after(value) -> float:
+    """Seconds asked for by a Retry-After header (delta-seconds or HTTP date), or None."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        moment = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=datetime.timezone.utc)
+    return max(0.0, (moment - datetime.datetime.now(datetime.timezone.utc)).total_seconds())
+
+
+class RetryPolicy:
+    """Exponential backoff with full jitter, capped at ``max_delay``.
+
+    Retry number n waits a random time between 0 and ``base_delay * 2**(n-1)``,
+    so products that failed together don't retry together. A Retry-After
+    header is honoured up to ``max_retry_after`` seconds.
+    """
+
+    def __init__(self, base_delay: float = None, max_delay: float = None, max_retry_after: float = None):
+        self.base_delay = base_delay or float(os.getenv('SCRAPER_RETRY_BASE_DELAY', '1'))
+        self.max_delay = max_delay or float(os.getenv('SCRAPER_RETRY_MAX_DELAY', '30'))
+        self.max_retry_after = max_retry_after or float(os.getenv('SCRAPER_RETRY_AFTER_MAX', '120'))
+
+    def backoff(self, attempt: int, base_delay: float = None) -> float:
+        base_delay = base_delay or self.base_delay
+        return random.uniform(0, min(self.max_delay, base_delay * 2 ** (attempt - 1)))
+
+    def retry_after(self, response) -> float:
+        if response is None:
+            return None
+        seconds = parse_retry_after(response.headers.get('Retry-After'))
+        return min(seconds, self.max_retry_after) if seconds is not None else None
+
+
+class TokenBucket:
+    """Token bucket of ``rate`` requests per second with room for ``burst`` at once.
+
+    ``reserve`` takes a token and returns how long the caller has to wait
+    before using it, instead of sleeping itself, so sync callers can
+    ``time.sleep`` and async callers ``await asyncio.sleep`` on the same
+    bucket. A rate of 0 means unlimited.
+    """
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.paused_until = 0.0
+        self._next_free = 0.0  # when the bucket would be empty again at the current pace
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self.paused_until)
+            if not self.rate:
+                return start - now
+            interval = 1.0 / self.rate
+            next_free = max(self._next_free, start)
+            ready = max(start, next_free - (self.burst - 1) * interval)
+            self._next_free = next_free + interval
+            return ready - now
+
+    def pause(self, seconds: float):
+        """Hold every request for ``seconds``, e.g. after a Retry-After."""
+        with self._lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+
+class HostRateLimiter:
+    """One token bucket per upstream host.
+
+    SCRAPER_HOST_RATE and SCRAPER_HOST_BURST set the default requests per
+    second and burst for every host; SCRAPER_HOST_RATES overrides the rate
+    for single hosts as ``host=rate`` pairs, e.g.
+    ``www.ebay.com=2,clients1.google.com=5``. The limits apply per process.
+    """
+
+    def __init__(self, rate: float = None, burst: int = None, host_rates: dict = None):
+        self.rate = rate if rate is not None else float(os.getenv('SCRAPER_HOST_RATE', '5'))
+        self.burst = burst or int(os.getenv('SCRAPER_HOST_BURST', '10'))
+        if host_rates is None:
+            host_rates = {}
+            for pair in os.getenv('SCRAPER_HOST_RATES', '').split(','):
+                host, _, host_rate = pair.partition('=')
+                if host.strip() and host_rate.strip():
+                    host_rates[host.strip().lower()] = float(host_rate)
+        self.host_rates = host_rates
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def bucket(self, url) -> TokenBucket:
+        host = (urlsplit(url).hostname or '').lower()
+        with self._lock:
+            if host not in self._buckets:
+                self._buckets[host] = TokenBucket(self.host_rates.get(host, self.rate), self.burst)
+            return self._buckets[host]
+
+    def reserve(self, url) -> float:
+        """Seconds to wait before sending a request to url's host."""
+        return self.bucket(url).reserve()
+
+    def pause(self, url, seconds: float):
+        self.bucket(url).pause(seconds)
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        with self._lock:
+            return {
+                host: {'rate': bucket.rate, 'paused': round(max(0.0, bucket.paused_until - now), 1)}
+                for host, bucket in self._buckets.items()
+            }
+
+
+_shared_limiter = None
+
+
+def get_rate_limiter() -> HostRateLimiter:
+    """The process-wide limiter, so concurrent scrapes share each host's budget."""
+    global _shared_limiter
+    if _shared_limiter is None:
+        _shared_limiter = HostRateLimiter()
+    return _shared_limiter
@@ -0,0 +1,91 @@
+import collections
+import os
+import threading
+import time
+from typing import Optional
+
+from ..async_crud import get_catalog_version
+from ..crud import catalog_change_listeners
+
+
+class CatalogReadCache:
+    """LRU + TTL cache of serialized product responses for the API process.
+
+    Entries are tagged with the catalog version (see crud.bump_catalog_version)
+    and only served while it is unchanged. Writes made in this process clear
+    the cache straight away through crud's change listeners. Scrapes run in
+    the worker, so the version is also re-read from the database, at most
+    every ``version_ttl`` seconds; that is how long a worker write can take
+    to show up.
+    """
+
+    def __init__(self, max_entries: int = None, ttl: float = None, version_ttl: float = None):
+        self.max_entries = max_entries or int(os.getenv('READ_CACHE_SIZE', '1000'))
+        self.ttl = ttl or float(os.getenv('READ_CACHE_TTL', '300'))
+        self.version_ttl = version_ttl if version_ttl is not None else float(os.getenv('READ_CACHE_VERSION_TTL', '2'))
+        self._entries = collections.OrderedDict()  # key -> (stored_at, version, body)
+        self._version = None
+        self._version_read_at = 0.0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    async def version(self, db) -> int:
+        """Current catalog version, read through the AsyncSession db at most every version_ttl seconds."""
+        now = time.monotonic()
+        with self._lock:
+            if self._version is not None and now - self._version_read_at < self.version_ttl:
+                return self._version
+        version = await get_catalog_version(db)
+        with self._lock:
+            if version != self._version:
+                self._entries.clear()
+            self._version = version
+            self._version_read_at = now
+        return version
+
+    def invalidate(self):
+        with self._lock:
+            self._entries.clear()
+            self._version = None
+
+    def get(self, key, version: int) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[1] == version and time.monotonic() - entry[0] <= self.ttl:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[2]
+            if entry:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def set(self, key, version: int, body: bytes):
+        with self._lock:
+            self._entries[key] = (time.monotonic(), version, body)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'version': self._version,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 3) if lookups else None,
+        }
+
+
+_shared_cache = None
+
+
+def get_read_cache() -> CatalogReadCache:
+    """The process-wide cache, cleared by every product write made through crud."""
+    global _shared_cache
+    if _shared_cache is None:
+        _shared_cache = CatalogReadCache()
+        catalog_change_listeners.append(_shared_cache.invalidate)
+    return _shared_cache
@@ -0,0 +1,173 @@
+import hashlib
+import os
+import struct
+import threading
+import time
+import zlib
+from typing import Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from .metrics import CACHE_LOOKUPS
+
+# Seconds a cached response stays fresh, per upstream source. eBay sold listings
+# move hourly, keyword suggestions barely change within a day and search volume
+# is a monthly figure, so it is kept for a week.
+DEFAULT_TTLS = {
+    'ebay': 3600,
+    'search_volume': 7 * 86400,
+    'keywords': 86400,
+}
+
+_HEADER = struct.Struct('>d')  # stored_at timestamp in front of the compressed body
+
+
+def normalize_url(url: str) -> str:
+    parts = urlsplit(url)
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path or '/', query, ''))
+
+
+class ResponseCache:
+    """TTL cache of upstream response bodies, stored zlib-compressed on disk.
+
+    Entries are content-addressed by the SHA-256 of the normalized URL. A
+    file's mtime is bumped on every hit, so when the directory grows past
+    ``max_bytes`` the least recently used entries are evicted first.
+    """
+
+    def __init__(self, directory: str, max_bytes: int = 256 * 1024 * 1024, ttls: dict = None, enabled: bool = True):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.ttls = {**DEFAULT_TTLS, **(ttls or {})}
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._bytes = None  # computed on first write
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls):
+        backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        directory = os.getenv('SCRAPER_CACHE_DIR', os.path.join(backend_dir, '.scraper_cache'))
+        max_bytes = int(os.getenv('SCRAPER_CACHE_MAX_MB', '256')) * 1024 * 1024
+        ttls = {}
+        for source in DEFAULT_TTLS:
+            value = os.getenv(f'SCRAPER_CACHE_TTL_{source.upper()}')
+            if value:
+                ttls[source] = int(value)
+        enabled = os.getenv('SCRAPER_CACHE', '1').lower() not in ('0', 'false', 'no')
+        return cls(directory, max_bytes=max_bytes, ttls=ttls, enabled=enabled)
+
+    def _path(self, url: str) -> str:
+        digest = hashlib.sha256(normalize_url(url).encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, digest[:2], digest)
+
+    def contains(self, source: str, url: str) -> bool:
+        """Whether a fresh entry exists, without counting a hit or miss."""
+        if not self.enabled:
+            return False
+        try:
+            with open(self._path(url), 'rb') as f:
+                (stored_at,) = _HEADER.unpack(f.read(_HEADER.size))
+        except (OSError, struct.error):
+            return False
+        return time.time() - stored_at <= self.ttls.get(source, 0)
+
+    def get(self, source: str, url: str) -> Optional[str]:
+        if not self.enabled:
+            return None
+        path = self._path(url)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            (stored_at,) = _HEADER.unpack_from(data)
+            if time.time() - stored_at > self.ttls.get(source, 0):
+                raise FileNotFoundError(path)
+            body = zlib.decompress(data[_HEADER.size:]).decode('utf-8')
+            os.utime(path)  # mark as recently used
+        except (OSError, struct.error, zlib.error, UnicodeDecodeError):
+            self.misses += 1
+            CACHE_LOOKUPS.labels(source, 'miss').inc()
+            return None
+        self.hits += 1
+        CACHE_LOOKUPS.labels(source, 'hit').inc()
+        return body
+
+    def set(self, source: str, url: str, body: str):
+        if not self.enabled or source not in self.ttls or body is None:
+            return
+        path = self._path(url)
+        data = _HEADER.pack(time.time()) + zlib.compress(body.encode('utf-8'), 6)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            previous = os.path.getsize(path) if os.path.exists(path) else 0
+            # Write then rename so a concurrent reader never sees half a file
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"Error writing response cache entry {path}: {e}")
+            return
+        with self._lock:
+            if self._bytes is None:
+                self._bytes = self._scan_size()
+            else:
+                self._bytes += len(data) - previous
+            if self._bytes > self.max_bytes:
+                self._evict()
+
+    def _entries(self):
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if name.endswith('.tmp'):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                yield path, stat.st_size, stat.st_mtime
+
+    def _scan_size(self) -> int:
+        return sum(size for _, size, _ in self._entries())
+
+    def _evict(self):
+        # Drop least recently used entries until we are back under 90% of the cap
+        target = self.max_bytes * 0.9
+        entries = sorted(self._entries(), key=lambda entry: entry[2])
+        total = sum(size for _, size, _ in entries)
+        for path, size, _ in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            self.evictions += 1
+        self._bytes = total
+
+    def clear(self):
+        with self._lock:
+            for path, _, _ in list(self._entries()):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            if self._bytes is None:
+                self._bytes = self._scan_size()
+        lookups = self.hits + self.misses
+        return {
+            'enabled': self.enabled,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0,
+            'evictions': self.evictions,
+            'bytes': self._bytes,
+        }
@@ -0,0 +1,79 @@
+import os
+import time
+
+import schedule
+
+from ..crud import get_active_scrape_jobs, get_stalest_products
+from ..database import SessionLocal
+from .http_sessions import HttpSessions
+
+# Products that have never been scraped are treated as ten years old, so they
+# go first while still being ordered by search volume among themselves
+NEVER_SCRAPED_AGE_HOURS = 24 * 365 * 10
+
+
+class IncrementalScheduler:
+    """Scrapes the stalest products first instead of sweeping the whole catalog.
+
+    A product's priority is its age since the last scrape, weighted up by
+    search volume and by how much its price moved between its last two scrapes:
+
+        age_hours * (1 + log10(1 + search_volume_us)) * (1 + volatility)
+
+    Every scrape write stores the scrape time and the weight (the last two
+    factors) on the product row, see crud.write_scraped_products, so each
+    tick ranks the catalog with one ORDER BY ... LIMIT query. A tick starts
+    no new product once ``time_budget`` seconds have passed, so it never
+    runs into the next one.
+    """
+
+    def __init__(self, batch_size: int = None, interval_minutes: int = None, time_budget: float = None, engine: str = None):
+        self.batch_size = batch_size or int(os.getenv('SCRAPER_TICK_BATCH', '50'))
+        self.interval_minutes = interval_minutes or int(os.getenv('SCRAPER_TICK_MINUTES', '10'))
+        # Leave headroom so the tick has finished writing before the next one is due
+        self.time_budget = time_budget or float(os.getenv('SCRAPER_TICK_BUDGET', self.interval_minutes * 60 * 0.8))
+        self.engine = engine
+
+    def stalest(self, db, count: int):
+        """(id, name) of the ``count`` highest-priority products, highest first."""
+        return get_stalest_products(db, count, NEVER_SCRAPED_AGE_HOURS)
+
+    def next_batch(self):
+        db = SessionLocal()
+        try:
+            active_jobs = get_active_scrape_jobs(db)
+            if any(job.product_id is None for job in active_jobs):
+                # A full-catalog job will refresh everything, don't duplicate its requests
+                print("Full catalog scrape job in progress, skipping tick")
+                return []
+            claimed = {job.product_id for job in active_jobs}
+            stalest = self.stalest(db, self.batch_size + len(claimed))
+        finally:
+            db.close()
+        return [(product_id, name) for product_id, name in stalest if product_id not in claimed][:self.batch_size]
+
+    def tick(self):
+        from .scraper import get_scraper
+
+        started = time.monotonic()
+        batch = self.next_batch()
+        if not batch:
+            print("No products to scrape this tick")
+            return {}
+        print(f"Scraping {len(batch)} stalest products (budget {self.time_budget:.0f}s)")
+        with HttpSessions() as sessions:
+            scraper = get_scraper(self.engine, sessions)
+            # Checked by the scraper as it starts each product, after its search volume read-ahead
+            scraper.deadline = started + self.time_budget
+            results = scraper.scrape_products(batch)
+        if scraper.past_deadline() and len(results) < len(batch):
+            print(f"Tick time budget of {self.time_budget:.0f}s used up, deferring remaining products")
+        print(f"Tick scraped {len(results)} of {len(batch)} products in {time.monotonic() - started:.1f}s")
+        return results
+
+    def run_forever(self):
+        self.tick()  # Run a tick straight away instead of waiting for the first interval
+        schedule.every(self.interval_minutes).minutes.do(self.tick)
+        while True:
+            schedule.run_pending()
+            time.sleep(1)
@@ -1,244 +1,490 @@
-import random
-import requests
-from bs4 import BeautifulSoup
 from sqlalchemy.orm import Session
 from ..database import SessionLocal, init_db
-from ..crud import create_product, get_product, update_product
+from ..crud import count_products_after, create_product
 from ..models import Product
+from .catalog import CatalogCheckpoint, iter_catalog
+from .ebay_parsers import get_parser, parse_result_count
+from .http_sessions import HttpSessions
+from .keyword_suggestions import get_keyword_cache, keyword_suggestions_url, parse_suggestions
+from .metrics import PARSE_SECONDS, PRODUCT_SECONDS, PRODUCTS_COMPLETED, UPSTREAM_RETRIES, observe_upstream
+from .price_stats import price_stats
+from .product_writer import BulkProductWriter
+from .proxy_pool import ProxyBannedError, ProxyPool
+from .rate_limit import RetryPolicy, get_rate_limiter
+from .response_cache import ResponseCache
+from .search_volume import SEARCH_VOLUME_COUNTRIES, batch_size_from_env, keyword_batches, search_volume_url, split_batch_response
+from concurrent.futures import ThreadPoolExecutor
 from urllib.parse import quote_plus
-import schedule
+import itertools
+import math
 import time
 import os
 from typing import Optional
-import xml.etree.ElementTree as ET
 import json
 from dotenv import load_dotenv
 
 class MarketplaceScraper:
-    def __init__(self):
+    engine = 'sync'  # Label on the per-engine metrics
+
+    def __init__(self, sessions: Optional[HttpSessions] = None):
         # Get the backend directory path (one level up from services)
         backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
         load_dotenv(os.path.join(backend_dir, '.env'))  # Load environment variables from .env in backend directory
         self.proxies = self.load_proxies()
+        # Pooled keep-alive clients, shared for the whole run when passed in by run_scraper
+        self.sessions = sessions or HttpSessions()
+        self._owns_sessions = sessions is None
+        self.parser = get_parser()
+        self.cache = ResponseCache.from_env()
+        self.search_volume_batch_size = batch_size_from_env()
+        self._prefetched_volumes = {}
+        self.keyword_cache = get_keyword_cache()
+        self.retry_policy = RetryPolicy()
+        self.rate_limiter = get_rate_limiter()
+        # Overridable so benchmarks can point the scraper at a local stub
+        self.ebay_base_url = os.getenv('EBAY_BASE_URL', 'https://www.ebay.com')
+        # Results per page (_ipg; eBay accepts 60, 120 and 240), the most pages to read per
+        # product, and the price sample to stop at (0: read up to SCRAPER_EBAY_PAGES pages)
+        self.ebay_page_size = int(os.getenv('SCRAPER_EBAY_PAGE_SIZE', '60'))
+        self.ebay_max_pages = int(os.getenv('SCRAPER_EBAY_PAGES', '1'))
+        self.ebay_sample_size = int(os.getenv('SCRAPER_EBAY_SAMPLE_SIZE', '0'))
+        self._page_pool = None
+        # Called with (product_id, seconds, ok) as each product finishes
+        self.on_product_done = None
+        self._product_started = {}
+        # time.monotonic() after which no further products are started (see past_deadline)
+        self.deadline = None
 
     def load_proxies(self):
-        try:
-            # Get proxy credentials from environment variables
-            username = os.getenv('PROXY_USERNAME')
-            password = os.getenv('PROXY_PASSWORD')
-            proxy_ip = os.getenv('PROXY_IP')
-            proxy_port = os.getenv('PROXY_PORT')
-            if not all([username, password, proxy_ip, proxy_port]):
-                raise EnvironmentError("One or more proxy environment variables are missing.")
-
-            # Create proxy string
-            proxy = f"{username}:{password}:{proxy_ip}:{proxy_port}"
-            print(f"Using proxy configuration (username:***:ip:port): {username}:***:{proxy_ip}:{proxy_port}")
-            
-            return [proxy]  # Return as list for compatibility with existing code
-            
-        except Exception as e:
-            print(f"Error loading proxy configuration: {e}")
-            # Return default proxy as fallback
-            return ["default_username:default_password:default_ip:default_port"]
+        proxy_pool = ProxyPool.from_env()
+        if not proxy_pool:
+            print("Error loading proxy configuration: no proxies configured in PROXY_* variables, PROXY_LIST or PROXY_FILE")
+            # Fall back to the default proxy so the run fails per request rather than at startup
+            return ProxyPool(["default_username:default_password:default_ip:default_port"])
+        print(f"Using proxy pool with {len(proxy_pool)} proxies: {', '.join(p.label for p in proxy_pool.proxies)}")
+        return proxy_pool
+
+    def product_started(self, product_id):
+        self._product_started[product_id] = time.perf_counter()
+
+    def product_finished(self, product_id, ok=True):
+        PRODUCTS_COMPLETED.labels(self.engine, 'ok' if ok else 'failed').inc()
+        started = self._product_started.pop(product_id, None)
+        if started is None:
+            return
+        seconds = time.perf_counter() - started
+        PRODUCT_SECONDS.labels(self.engine).observe(seconds)
+        if self.on_product_done:
+            self.on_product_done(product_id, seconds, ok)
+
+    def http_get(self, url, proxy=None):
+        """GET url once its host's rate limit allows."""
+        time.sleep(self.rate_limiter.reserve(url))
+        return self.sessions.get(url, proxy=proxy)
+
+    def retry_wait(self, url, attempt, error, delay=None) -> float:
+        """Seconds to wait before retrying url after attempt number attempt failed with error."""
+        response = getattr(error, 'response', None)
+        retry_after = self.retry_policy.retry_after(response)
+        if retry_after is not None:
+            # The host asked every client to back off, so hold its whole bucket;
+            # the retry then waits its turn in http_get like any other request
+            self.rate_limiter.pause(url, retry_after)
+            return 0.0
+        backoff = self.retry_policy.backoff(attempt, delay)
+        if response is not None and response.status_code >= 500:
+            return backoff
+        # Proxy trouble: another proxy can take the retry straight away if one is healthy
+        return min(backoff, self.proxies.wait_time())
 
-    def generate_url(self, keywords):
+    def generate_url(self, keywords, page=1):
         encoded_keywords = quote_plus(keywords)
-        ebay_url = f"https://www.ebay.com/sch/i.html?_from=R40&_nkw={encoded_keywords}&_sacat=0&LH_Sold=1&LH_Complete=1&_udlo=0&rt=nc"
+        ebay_url = f"{self.ebay_base_url}/sch/i.html?_from=R40&_nkw={encoded_keywords}&_sacat=0&LH_Sold=1&LH_Complete=1&_udlo=0&rt=nc&_ipg={self.ebay_page_size}"
+        if page > 1:
+            ebay_url += f"&_pgn={page}"
         return ebay_url
 
-    def fetch_page_content(self, url, retries=3, delay=7):
+    def ebay_extra_pages(self, first_page_html) -> range:
+        """Page numbers after the first that are worth requesting.
+
+        Bounded by SCRAPER_EBAY_PAGES, by the pages needed to reach the sample
+        size, and by the result count on the first page, so searches with few
+        sold listings stop after one request.
+        """
+        pages = self.ebay_max_pages
+        if self.ebay_sample_size:
+            pages = min(pages, math.ceil(self.ebay_sample_size / self.ebay_page_size))
+        total = parse_result_count(first_page_html)
+        if total is not None:
+            pages = min(pages, math.ceil(total / self.ebay_page_size))
+        return range(2, pages + 1)
+
+    def merge_ebay_pages(self, parsed_pages):
+        """One (prices, listings) sample from parsed pages given in page order."""
+        if not parsed_pages:
+            return [], []
+        prices = []
+        for page_prices, _ in parsed_pages:
+            prices.extend(page_prices)
+        if self.ebay_sample_size:
+            prices = prices[:self.ebay_sample_size]
+        # Every page repeats the same total result count, so take it once
+        return prices, parsed_pages[0][1]
+
+    def fetch_ebay_pages(self, keywords):
+        """HTML of each results page worth reading: the first, then the rest concurrently."""
+        first_page = self.fetch_page_content(self.generate_url(keywords))
+        if not first_page:
+            return []
+        extra_pages = self.ebay_extra_pages(first_page)
+        if not extra_pages:
+            return [first_page]
+        if self._page_pool is None:
+            self._page_pool = ThreadPoolExecutor(max(1, self.ebay_max_pages - 1), thread_name_prefix='ebay-page')
+        rest = self._page_pool.map(lambda page: self.fetch_page_content(self.generate_url(keywords, page)), extra_pages)
+        return [first_page, *(html for html in rest if html)]
+
+    def fetch_page_content(self, url, retries=3, delay=None):
+        cached = self.cache.get('ebay', url)
+        if cached is not None:
+            return cached
         if not self.proxies:
             raise ValueError("No proxies loaded. Please check your proxy file.")
 
         for attempt in range(1, retries + 1):
-            proxy = random.choice(self.proxies)
-            try:
-                username, password, ip, port = proxy.split(':')
-                formatted_proxy = f"http://{username}:{password}@{ip}:{port}/"
-                proxies_dict = {"http": formatted_proxy, "https": formatted_proxy}
-            except ValueError:
-                print(f"Invalid proxy format: {proxy}. Expected 'username:password:ip:port'.")
-                continue
-
+            proxy = self.proxies.acquire()
+            started = time.monotonic()
             try:
-                response = requests.get(url, proxies=proxies_dict, timeout=10)
+                response = self.http_get(url, proxy=proxy.url)
+                if self.proxies.is_ban(response.status_code, response.text):
+                    raise ProxyBannedError(f"Proxy {proxy.label} blocked with status {response.status_code}", response)
                 response.raise_for_status()
+                self.proxies.report_success(proxy, time.monotonic() - started)
+                observe_upstream('ebay', started)
+                self.cache.set('ebay', url, response.text)
                 return response.text
             except Exception as e:
+                banned = isinstance(e, ProxyBannedError)
+                self.proxies.report_failure(proxy, banned=banned)
+                observe_upstream('ebay', started, 'banned' if banned else 'error')
                 print(f"Attempt {attempt} failed for URL: {url} with error: {e}")
                 if attempt < retries:
-                    time.sleep(delay)
+                    UPSTREAM_RETRIES.labels('ebay').inc()
+                    time.sleep(self.retry_wait(url, attempt, e, delay))
                 else:
                     print(f"All {retries} attempts failed for URL: {url}")
                     return None
 
     def parse_ebay_results(self, html_content):
-        soup = BeautifulSoup(html_content, 'html.parser')
+        started = time.perf_counter()
+        try:
+            return self.parser(html_content)
+        finally:
+            PARSE_SECONDS.labels(self.parser.__name__).observe(time.perf_counter() - started)
 
-        price_results = soup.find_all('div', {'class': 's-item__info clearfix'})  # Div with price info
-        prices = []
-        
-        for item in price_results:
-            price_text = item.find('span', {'class': 's-item__price'})  # Span with item price
-            if price_text:
-                price_str = price_text.text.replace('$', '').replace(',', '').strip()  # Clean price string
-                try:
-                    price = float(price_str)  # Convert to float
-                    prices.append(price)  # Append prices to list
-                except ValueError:
-                    continue
-
-        listing_results = soup.find_all('div', {'class': 'srp-controls__control srp-controls__count'})  # Div with listing info
-        listings = []
-        for listing in listing_results:
-            listing_text = listing.find('h1', {'class': 'srp-controls__count-heading'})  # H1 with listing amount
-            if listing_text:
-                # Clean and truncate text at the first non-numeric character
-                cleaned_text = listing_text.text.replace('results for', '').strip()
-                cleaned_text = ''.join(char for char in cleaned_text if char.isdigit() or char == '+')
-                listings.append(cleaned_text)
-
-        return prices, listings
-
-    def search_volume(self, keywords, country_code, retries=3, delay=5):
+    def parse_search_volume(self, data):
+        if data:
+            key, value = list(data.items())[0]
+            return f'{value:,}'
+        return None
+
+    def fetch_json(self, url, retries=3, delay=None, parse=None):
+        """GET a JSON API through the proxy pool; returns (data, body) or (None, None).
+
+        ``parse`` is applied to the data inside the retry loop, so a body it
+        can't read counts as a failed attempt, and the result replaces data.
+        """
         if not self.proxies:
             raise ValueError("No proxies loaded. Please check your proxy file.")
 
-        url = f'https://api.searchvolume.com/search_volume?country={country_code}&keywords={keywords}'
-
         for attempt in range(retries):
-            proxy = random.choice(self.proxies)
-            username, password, ip, port = proxy.split(':')
-            formatted_proxies = {
-                "http": f"http://{username}:{password}@{ip}:{port}/",
-                "https": f"http://{username}:{password}@{ip}:{port}/"
-            }
-
+            proxy = self.proxies.acquire()
+            started = time.monotonic()
             try:
-                response = requests.get(url, proxies=formatted_proxies, timeout=10)
+                response = self.http_get(url, proxy=proxy.url)
+                if self.proxies.is_ban(response.status_code):
+                    raise ProxyBannedError(f"Proxy {proxy.label} blocked with status {response.status_code}", response)
                 response.raise_for_status()
                 data = response.json()
+                if data and parse:
+                    data = parse(data)
+                self.proxies.report_success(proxy, time.monotonic() - started)
+                observe_upstream('search_volume', started)
                 if data:
-                    key, value = list(data.items())[0]
-                    volume = f'{value:,}'
-                    return volume
+                    return data, response.text
             except Exception as e:
+                banned = isinstance(e, ProxyBannedError)
+                self.proxies.report_failure(proxy, banned=banned)
+                observe_upstream('search_volume', started, 'banned' if banned else 'error')
                 print(f"Attempt {attempt + 1} failed: {e}")
                 if attempt < retries - 1:
-                    time.sleep(delay)
+                    UPSTREAM_RETRIES.labels('search_volume').inc()
+                    time.sleep(self.retry_wait(url, attempt + 1, e, delay))
                 else:
                     print("All retry attempts failed.")
-                    return None
+        return None, None
+
+    def cached_search_volume(self, url):
+        """A prefetched or cached single-keyword response body, or None."""
+        prefetched = self._prefetched_volumes.pop(url, None)
+        if prefetched is not None:
+            return prefetched
+        return self.cache.get('search_volume', url)
+
+    def search_volume(self, keywords, country_code, retries=3, delay=None):
+        url = search_volume_url(keywords, country_code)
+        cached = self.cached_search_volume(url)
+        if cached is not None:
+            try:
+                return self.parse_search_volume(json.loads(cached))
+            except (ValueError, TypeError, AttributeError) as e:
+                print(f"Ignoring unreadable search volume response for {url}: {e}")
+        volume, body = self.fetch_json(url, retries, delay, parse=self.parse_search_volume)
+        # Only bodies that parsed are cached
+        if volume:
+            self.cache.set('search_volume', url, body)
+        return volume
+
+    def missing_search_volumes(self, product_names):
+        """(country, names) pairs whose single-keyword lookups are not cached yet."""
+        for country_code in SEARCH_VOLUME_COUNTRIES:
+            names = [
+                name for name in product_names
+                if search_volume_url(name, country_code) not in self._prefetched_volumes
+                and not self.cache.contains('search_volume', search_volume_url(name, country_code))
+            ]
+            if names:
+                yield country_code, names
+
+    def store_search_volumes(self, batch, country_code, data):
+        # Store each keyword under its one-keyword URL so search_volume() finds it. The
+        # in-memory copy is used once and covers runs with the response cache switched off.
+        for name, body in split_batch_response(batch, data).items():
+            url = search_volume_url(name, country_code)
+            self._prefetched_volumes[url] = body
+            self.cache.set('search_volume', url, body)
+
+    def prefetch_search_volumes(self, product_names):
+        """Look up many products in one request per country and batch."""
+        for country_code, names in self.missing_search_volumes(product_names):
+            for batch in keyword_batches(names, self.search_volume_batch_size):
+                data, _ = self.fetch_json(search_volume_url(batch, country_code))
+                if data:
+                    self.store_search_volumes(batch, country_code, data)
+
+    def past_deadline(self) -> bool:
+        return self.deadline is not None and time.monotonic() >= self.deadline
+
+    def product_chunks(self, product_list):
+        """product_list in lists of one search volume batch each."""
+        products = iter(product_list)
+        while chunk := list(itertools.islice(products, self.search_volume_batch_size)):
+            yield chunk
+
+    def with_search_volumes(self, product_list):
+        """Yield product_list unchanged, prefetching search volumes one batch ahead.
+
+        Stops once the deadline has passed. That is checked as each product is
+        handed out, not as it is read, since a whole batch is read ahead.
+        """
+        for chunk in self.product_chunks(product_list):
+            if self.past_deadline():
+                return
+            self.prefetch_search_volumes([name for _, name in chunk])
+            for product in chunk:
+                if self.past_deadline():
+                    return
+                yield product
+
+    def cached_keyword_suggestions(self, base_keyword):
+        """Suggestions from the shared in-memory cache or the response cache, or None."""
+        suggestions = self.keyword_cache.get(base_keyword)
+        if suggestions is None:
+            cached = self.cache.get('keywords', keyword_suggestions_url(base_keyword))
+            if cached is not None:
+                suggestions = parse_suggestions(cached)
+                if suggestions is not None:
+                    self.keyword_cache.set(base_keyword, suggestions)
+        return suggestions
+
+    def store_keyword_suggestions(self, base_keyword, xml_text):
+        suggestions = parse_suggestions(xml_text)
+        if suggestions is not None:
+            self.cache.set('keywords', keyword_suggestions_url(base_keyword), xml_text)
+            self.keyword_cache.set(base_keyword, suggestions)
+        return suggestions
 
     def fetch_popular_keywords(self, base_keyword):
-        url = f"https://clients1.google.com/complete/search?hl=en&output=toolbar&q={quote_plus(base_keyword)}"
-        response = requests.get(url)
-        
+        suggestions = self.cached_keyword_suggestions(base_keyword)
+        if suggestions is not None:
+            return json.dumps(suggestions)
+        started = time.monotonic()
+        try:
+            response = self.http_get(keyword_suggestions_url(base_keyword))
+        except Exception as e:
+            observe_upstream('keywords', started, 'error')
+            print(f"Error fetching keyword suggestions: {e}")
+            return json.dumps([])
+        observe_upstream('keywords', started, 'ok' if response.status_code == 200 else 'error')
+
         if response.status_code == 200:
-            try:
-                root = ET.fromstring(response.text)
-                suggestions = [suggestion.attrib['data'] for suggestion in root.findall(".//suggestion")]
+            suggestions = self.store_keyword_suggestions(base_keyword, response.text)
+            if suggestions is not None:
                 return json.dumps(suggestions)  # Always return a JSON string
-            except ET.ParseError:
-                print("Error parsing XML response")
-        
-        return json.dumps([])  # <- fixed here
 
-    def scrape_products(self, product_list):
+        return json.dumps([])
+
+    def build_product_data(self, ebay_prices, ebay_listings, search_volume_us, search_volume_au, search_volume_uk, popular_keywords):
+        average_ebay_price = round(sum(ebay_prices) / len(ebay_prices), 2) if ebay_prices else 0
+        sale_amount = round(sum(ebay_prices), 2)
+
+        # Convert ebay_listings to an integer
+        total_ebay_listings = 0
+        for listing in ebay_listings:
+            if listing.endswith('+'):
+                listing = listing[:-1]  # Remove the trailing '+'
+            try:
+                total_ebay_listings += int(listing)
+            except ValueError:
+                continue
+
+        return {
+            'average_ebay_price': average_ebay_price,
+            **price_stats(ebay_prices),
+            'ebay_prices': json.dumps(ebay_prices),
+            'ebay_listings': total_ebay_listings,
+            'ebay_sale_amount': sale_amount,
+            'search_volume_us': search_volume_us if search_volume_us else '0',
+            'search_volume_au': search_volume_au if search_volume_au else '0',
+            'search_volume_uk': search_volume_uk if search_volume_uk else '0',
+            'popular_keywords': popular_keywords,
+            'last_updated': time.strftime('%Y-%m-%d')
+        }
+
+    def scrape_products(self, product_list, collect_results=True, on_flush=None):
+        # Full-catalog runs pass collect_results=False so results stream to the DB only
         results = {}
-        db = SessionLocal()
-        for product_id, product_name in product_list:
-            ebay_url = self.generate_url(product_name)
-            print(f"Scraping eBay URL: {ebay_url}")
-            
-            html_econtent = self.fetch_page_content(ebay_url)
+        scraped = 0
+        writer = BulkProductWriter(on_flush=on_flush)
+        try:
+            for product_id, product_name in self.with_search_volumes(product_list):
+                self.product_started(product_id)
+                ebay_url = self.generate_url(product_name)
+                print(f"Scraping eBay URL: {ebay_url}")
             
-            if html_econtent:
-                ebay_prices, ebay_listings = self.parse_ebay_results(html_econtent)
-                print(f"eBay prices: {ebay_prices}")
-            else:
-                ebay_prices, ebay_listings = [], []
-
-            search_volume_us = self.search_volume(product_name, 'us')
-            search_volume_au = self.search_volume(product_name, 'au')
-            search_volume_uk = self.search_volume(product_name, 'gb')
+                pages = self.fetch_ebay_pages(product_name)
+                ebay_prices, ebay_listings = self.merge_ebay_pages([self.parse_ebay_results(html) for html in pages])
+                if pages:
+                    print(f"eBay prices: {ebay_prices}")
+
+                search_volume_us = self.search_volume(product_name, 'us')
+                search_volume_au = self.search_volume(product_name, 'au')
+                search_volume_uk = self.search_volume(product_name, 'gb')
             
-            popular_keywords = self.fetch_popular_keywords(product_name)
+                popular_keywords = self.fetch_popular_keywords(product_name)
+
+                product_data = self.build_product_data(
+                    ebay_prices, ebay_listings, search_volume_us, search_volume_au, search_volume_uk, popular_keywords
+                )
+                print(f"Queueing update for product ID '{product_id}' with data: {product_data}")
+                writer.add(product_id, product_data)
+                self.product_finished(product_id)
+                scraped += 1
+                if collect_results:
+                    results[product_id] = product_data
+        finally:
+            # Keep what was scraped before a failure, and don't leave threads or connections behind
+            try:
+                writer.close()
+            finally:
+                if self._page_pool is not None:
+                    self._page_pool.shutdown()
+                    self._page_pool = None
+                if self._owns_sessions:
+                    self.sessions.close()
+        print(f"Proxy pool stats: {self.proxies.stats()}")
+        print(f"Response cache stats: {self.cache.stats()}")
+        print(f"Keyword cache stats: {self.keyword_cache.stats()}")
+        return results if collect_results else {'products_scraped': scraped}
+
+SCRAPER_ENGINES = ('sync', 'async', 'pipeline')
+
+def get_scraper(engine: Optional[str] = None, sessions: Optional[HttpSessions] = None):
+    """Return the scraper for ``engine`` ("sync", "async" or "pipeline"), defaulting to SCRAPER_ENGINE."""
+    engine = (engine or os.getenv('SCRAPER_ENGINE', 'sync')).lower()
+    if engine == 'async':
+        from .async_scraper import AsyncMarketplaceScraper
+        return AsyncMarketplaceScraper(sessions=sessions)
+    if engine == 'pipeline':
+        from .pipeline_scraper import PipelineMarketplaceScraper
+        return PipelineMarketplaceScraper(sessions=sessions)
+    if engine != 'sync':
+        raise ValueError(f"Unknown scraper engine: {engine}")
+    return MarketplaceScraper(sessions=sessions)
+
+def run_scraper(product_id: Optional[int] = None, engine: Optional[str] = None, on_progress=None):
+    """Scrape one product, or the whole catalog when product_id is None.
+
+    on_progress, if given, is called as on_progress(products_done, products_total)
+    every time a batch of results has been written.
+    """
+    progress = {'done': 0, 'total': 0}
 
-            average_ebay_price = round(sum(ebay_prices) / len(ebay_prices), 2) if ebay_prices else 0
-            sale_amount = round(sum(ebay_prices), 2)
+    def report(product_ids):
+        progress['done'] += len(product_ids)
+        if on_progress:
+            on_progress(progress['done'], progress['total'])
 
-            # Convert ebay_listings to an integer
-            total_ebay_listings = 0
-            for listing in ebay_listings:
-                if listing.endswith('+'):
-                    listing = listing[:-1]  # Remove the trailing '+'
+    # One pool of keep-alive connections for every request in this run
+    with HttpSessions() as sessions:
+        if product_id:
+            print(f"Running scraper for product ID: {product_id}")
+            try:
+                db = SessionLocal()
+                product = db.query(Product).filter(Product.id == product_id).first()
+                db.close()
+                if product:
+                    progress['total'] = 1
+                    scraper = get_scraper(engine, sessions)
+                    results = scraper.scrape_products([(product.id, product.name)], on_flush=report)
+                    print("Scraping completed. Results:", results)
+                    return results
+                else:
+                    print(f"Product ID '{product_id}' not found in the database.")
+                    return None
+            except Exception as e:
+                print(f"Error in run_scraper: {e}")
+                raise
+        else:
+            print("Running scraper for all products")
+            try:
+                checkpoint = CatalogCheckpoint('full_catalog')
+                start_after = checkpoint.load()
+                if start_after:
+                    print(f"Resuming full catalog run after product ID {start_after}")
+                db = SessionLocal()
                 try:
-                    total_ebay_listings += int(listing)
-                except ValueError:
-                    continue
-
-            product_data = {
-                'average_ebay_price': average_ebay_price,
-                'ebay_listings': total_ebay_listings,
-                'ebay_sale_amount': sale_amount,
-                'search_volume_us': search_volume_us if search_volume_us else '0',
-                'search_volume_au': search_volume_au if search_volume_au else '0',
-                'search_volume_uk': search_volume_uk if search_volume_uk else '0',
-                'popular_keywords': popular_keywords,
-                'last_updated': time.strftime('%Y-%m-%d')
-            }
-            print(f"Updating product ID '{product_id}' with data: {product_data}")
-            existing_product = get_product(db, product_id)
-            if existing_product:
-                print(f"Calling update_product for product ID '{product_id}' with data: {product_data}")
-                update_product(db, product_id, product_data)
-                print(f"Committing changes for product ID '{product_id}'")
-                db.commit()  # Commit the session to save changes
-                db.refresh(existing_product)  # Refresh the instance with the latest data from the database
-                print(f"Updated product data: {existing_product.__dict__}")
-            else:
-                print(f"Product ID '{product_id}' not found in the database. Skipping creation.")
-            results[product_id] = product_data
-        db.close()
-        return results
-
-def run_scraper(product_id: Optional[int] = None):
-    if product_id:
-        print(f"Running scraper for product ID: {product_id}")
-        try:
-            db = SessionLocal()
-            product = db.query(Product).filter(Product.id == product_id).first()
-            db.close()
-            if product:
-                scraper = MarketplaceScraper()
-                results = scraper.scrape_products([(product.id, product.name)])
-                print("Scraping completed. Results:", results)
-                return results
-            else:
-                print(f"Product ID '{product_id}' not found in the database.")
-                return None
-        except Exception as e:
-            print(f"Error in run_scraper: {e}")
-            raise
-    else:
-        print("Running scraper for all products")
-        try:
-            db = SessionLocal()
-            product_list = [(product.id, product.name) for product in db.query(Product).all()]
-            db.close()
-            scraper = MarketplaceScraper()
-            results = scraper.scrape_products(product_list)
-            print("Scraping completed. Results:", results)
-            return results
-        except Exception as e:
-            print(f"Error in run_scraper: {e}")
-            raise
+                    progress['total'] = count_products_after(db, start_after)
+                finally:
+                    db.close()
+
+                def advance(product_ids):
+                    checkpoint.advance(product_ids)
+                    report(product_ids)
+
+                scraper = get_scraper(engine, sessions)
+                summary = scraper.scrape_products(
+                    checkpoint.track(iter_catalog(start_after)), collect_results=False, on_flush=advance
+                )
+                checkpoint.clear()
+                print("Scraping completed.", summary)
+                return summary
+            except Exception as e:
+                print(f"Error in run_scraper: {e}")
+                raise
 
 if __name__ == "__main__":
-    run_scraper()  # Force run the scraper initially
-    schedule.every().hour.do(run_scraper)
-    while True:
-        schedule.run_pending()
-        time.sleep(1)
\ No newline at end of file
+    from .scheduler import IncrementalScheduler
+
+    # Scrape the stalest products each tick rather than sweeping the whole catalog hourly
+    IncrementalScheduler().run_forever()
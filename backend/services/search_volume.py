@@ -0,0 +1,66 @@
+import json
+import os
+from urllib.parse import quote_plus
+
+DEFAULT_SEARCH_VOLUME_API = 'https://api.searchvolume.com/search_volume'
+
+# Country codes we look up, mapped to the Product column they fill
+SEARCH_VOLUME_COUNTRIES = {
+    'us': 'search_volume_us',
+    'au': 'search_volume_au',
+    'gb': 'search_volume_uk',
+}
+
+
+def batch_size_from_env() -> int:
+    return int(os.getenv('SEARCH_VOLUME_BATCH', '50'))
+
+
+def search_volume_url(keywords, country_code) -> str:
+    """URL for one keyword, or several joined with commas."""
+    if not isinstance(keywords, str):
+        keywords = ','.join(keywords)
+    api = os.getenv('SEARCH_VOLUME_API', DEFAULT_SEARCH_VOLUME_API)
+    return f'{api}?country={country_code}&keywords={quote_plus(keywords)}'
+
+
+def keyword_batches(keywords, batch_size: int):
+    """Split keywords into comma-joinable batches.
+
+    Duplicates are dropped, and keywords that contain a comma themselves are
+    left out since they can't be told apart in a batched request; those fall
+    back to the one-keyword lookup.
+    """
+    batch = []
+    for keyword in dict.fromkeys(keywords):
+        if ',' in keyword or not keyword.strip():
+            continue
+        batch.append(keyword)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def split_batch_response(batch, data: dict) -> dict:
+    """Map a batched {keyword: volume} response back onto each requested keyword.
+
+    Returns {keyword: single_keyword_body} where the body is what a one-keyword
+    request would have returned, so it can be cached under that request's URL.
+    Keywords missing from the response, or whose volume isn't a number, are
+    left out rather than guessed as 0 (the batch may have been cut short), so
+    they get a one-keyword lookup.
+    """
+    if not isinstance(data, dict):
+        return {}
+    volumes = {
+        str(key).strip().lower(): value
+        for key, value in data.items()
+        if isinstance(value, int) and not isinstance(value, bool)
+    }
+    return {
+        keyword: json.dumps({keyword: volumes[keyword.strip().lower()]})
+        for keyword in batch
+        if keyword.strip().lower() in volumes
+    }
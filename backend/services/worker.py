@@ -0,0 +1,117 @@
+import datetime
+import os
+import socket
+import threading
+import time
+import traceback
+
+from prometheus_client import start_http_server
+
+from ..crud import claim_next_scrape_job, requeue_stale_scrape_jobs, update_scrape_job
+from ..database import SessionLocal, init_db
+from .scraper import run_scraper
+
+
+class ScrapeWorker:
+    """Claims scrape jobs from the scrape_jobs table and runs them outside the web process.
+
+    Run one or more with ``python -m backend.services.worker`` (the ``worker``
+    entry in the Procfile). While a job runs, a heartbeat is written every
+    ``heartbeat_interval`` seconds; running jobs whose heartbeat is older
+    than ``stale_after`` are assumed dead and requeued, and a full-catalog
+    job then resumes from its checkpoint.
+    """
+
+    def __init__(self, poll_interval: float = None, heartbeat_interval: float = None, stale_after: float = None):
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self.poll_interval = poll_interval or float(os.getenv('WORKER_POLL_SECONDS', '5'))
+        self.heartbeat_interval = heartbeat_interval or float(os.getenv('WORKER_HEARTBEAT_SECONDS', '30'))
+        self.stale_after = stale_after or float(os.getenv('WORKER_STALE_SECONDS', '300'))
+        self.max_attempts = int(os.getenv('WORKER_MAX_ATTEMPTS', '3'))
+
+    def _update(self, job_id, **fields):
+        db = SessionLocal()
+        try:
+            update_scrape_job(db, job_id, **fields)
+        finally:
+            db.close()
+
+    def _heartbeat(self, job_id, stop: threading.Event):
+        while not stop.wait(self.heartbeat_interval):
+            try:
+                self._update(job_id, heartbeat_at=datetime.datetime.utcnow())
+            except Exception as e:
+                print(f"Error writing heartbeat for job {job_id}: {e}")
+
+    def requeue_stale(self):
+        stale_before = datetime.datetime.utcnow() - datetime.timedelta(seconds=self.stale_after)
+        db = SessionLocal()
+        try:
+            for job in requeue_stale_scrape_jobs(db, stale_before, self.max_attempts):
+                print(f"Job {job.id} stopped heartbeating after {job.attempts} attempts, now {job.status}")
+        finally:
+            db.close()
+
+    def claim(self):
+        db = SessionLocal()
+        try:
+            job = claim_next_scrape_job(db, self.worker_id)
+            if job:
+                db.expunge(job)
+            return job
+        finally:
+            db.close()
+
+    def run_job(self, job):
+        print(f"Worker {self.worker_id} running job {job.id} (product {job.product_id or 'all'}, attempt {job.attempts})")
+
+        def on_progress(products_done, products_total):
+            self._update(
+                job.id,
+                products_done=products_done,
+                products_total=products_total,
+                heartbeat_at=datetime.datetime.utcnow(),
+            )
+
+        stop = threading.Event()
+        heartbeat = threading.Thread(target=self._heartbeat, args=(job.id, stop), daemon=True)
+        heartbeat.start()
+        try:
+            run_scraper(job.product_id, engine=job.engine, on_progress=on_progress)
+        except Exception as e:
+            traceback.print_exc()
+            self._update(job.id, status="failed", error=str(e)[:1000], finished_at=datetime.datetime.utcnow())
+        else:
+            self._update(job.id, status="succeeded", finished_at=datetime.datetime.utcnow())
+        finally:
+            stop.set()
+            heartbeat.join()
+
+    def run_once(self):
+        """Run at most one job; returns True if a job was run."""
+        self.requeue_stale()
+        job = self.claim()
+        if not job:
+            return False
+        self.run_job(job)
+        return True
+
+    def run_forever(self):
+        print(f"Scrape worker {self.worker_id} started")
+        while True:
+            try:
+                ran = self.run_once()
+            except Exception as e:
+                print(f"Error in scrape worker loop: {e}")
+                ran = False
+            if not ran:
+                time.sleep(self.poll_interval)
+
+
+if __name__ == "__main__":
+    init_db()
+    metrics_port = os.getenv('WORKER_METRICS_PORT')
+    if metrics_port:
+        # For hosts where the web process can't read this worker's metrics (see services/metrics.py)
+        start_http_server(int(metrics_port))
+    ScrapeWorker().run_forever()
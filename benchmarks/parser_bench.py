@@ -0,0 +1,69 @@
+"""Pages/sec microbenchmark for the eBay parser backends.
+
+Run from the repository root:
+
+    python -m benchmarks.parser_bench [--seconds 2] [--json]
+
+Parses each ``fixtures/ebay_*.html`` page with every backend. That they all
+reproduce ``fixtures/<name>.expected.json`` is checked by
+tests/test_parse_ebay_results.py.
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+
+from backend.services.ebay_parsers import PARSER_BACKENDS
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+
+def load_fixtures():
+    fixtures = []
+    for html_path in sorted(glob.glob(os.path.join(FIXTURES_DIR, 'ebay_*.html'))):
+        expected_path = html_path[:-len('.html')] + '.expected.json'
+        with open(html_path, encoding='utf-8') as f:
+            html_content = f.read()
+        with open(expected_path, encoding='utf-8') as f:
+            expected = json.load(f)
+        fixtures.append((os.path.basename(html_path), html_content, (expected['prices'], expected['listings'])))
+    return fixtures
+
+
+def bench(parse, html_content, seconds):
+    pages = 0
+    started = time.perf_counter()
+    deadline = started + seconds
+    while time.perf_counter() < deadline:
+        parse(html_content)
+        pages += 1
+    return pages / (time.perf_counter() - started)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--seconds', type=float, default=2.0, help="time spent per backend and fixture")
+    parser.add_argument('--json', action='store_true', help="print machine-readable results")
+    args = parser.parse_args(argv)
+
+    fixtures = load_fixtures()
+    results = {}
+    for backend, parse in PARSER_BACKENDS.items():
+        results[backend] = {
+            name: round(bench(parse, html_content, args.seconds), 1)
+            for name, html_content, _ in fixtures
+        }
+
+    if args.json:
+        print(json.dumps({'unit': 'pages_per_second', 'results': results}, indent=2))
+    else:
+        for backend, per_fixture in results.items():
+            for name, pages_per_second in per_fixture.items():
+                print(f"{backend:>6}  {name:<28} {pages_per_second:>10.1f} pages/s")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
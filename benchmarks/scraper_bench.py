@@ -0,0 +1,233 @@
+"""End-to-end scraper throughput benchmark against a local stub upstream.
+
+Run from the repository root:
+
+    python -m benchmarks.scraper_bench [--products 200] [--engines sync,async,pipeline]
+                                       [--latency-ms 50] [--error-rate 0.02] [--json]
+                                       [--output run.json] [--compare baseline.json]
+
+No network or proxies are used: ``benchmarks.stub_upstream`` replays the
+recorded fixtures with the requested latency and error rates. The stub also
+acts as every proxy in the pool. Each engine runs in its own process against
+a fresh SQLite catalog of ``--products`` synthetic products in a temporary
+directory, with the response cache off. The run reports products/sec,
+p50/p95 per-product latency (from when the engine picks a product up until
+its data is queued for writing), peak RSS and the number of upstream
+requests. ``--output`` writes the results as JSON, and ``--compare`` prints
+the change against an earlier output file.
+"""
+import argparse
+import contextlib
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+BRANDS = ['Nike', 'Jordan', 'Adidas', 'New Balance', 'Asics', 'Yeezy', 'Lego', 'Pokemon', 'Funko', 'Supreme']
+MODELS = ['Air Max 90', 'Retro 1 High', 'Samba OG', '550', 'Gel Lyte III', 'Boost 350', 'Technic 42115', 'Charizard Holo', 'Pop Vinyl', 'Box Logo Tee']
+VARIANTS = ['Black', 'White', 'Chicago', 'Bred', 'Size 10', 'Size 9', 'Sealed', 'PSA 10', 'Limited', 'Used']
+
+
+def synthetic_catalog(count: int, seed: int = 0):
+    rng = random.Random(seed)
+    return [f"{rng.choice(BRANDS)} {rng.choice(MODELS)} {rng.choice(VARIANTS)} {i}" for i in range(count)]
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def peak_rss_mb(children=False):
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF)
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    divisor = 1024 * 1024 if sys.platform == 'darwin' else 1024
+    return round(usage.ru_maxrss / divisor, 1)
+
+
+def run_engine(engine: str, products: int, seed: int):
+    """Child process body: build the catalog, scrape it, return the measurements."""
+    from backend import database
+    if not database.DATABASE_URL.startswith('sqlite'):
+        raise SystemExit("Refusing to benchmark against a non-SQLite DATABASE_URL")
+    from sqlalchemy import insert
+    from backend.models import Product
+    from backend.services.catalog import iter_catalog
+    from backend.services.scraper import get_scraper
+
+    database.init_db()
+    db = database.SessionLocal()
+    try:
+        db.execute(insert(Product), [{'name': name, 'image_url': ''} for name in synthetic_catalog(products, seed)])
+        db.commit()
+    finally:
+        db.close()
+
+    latencies = []
+    failed = 0
+
+    def on_product_done(product_id, seconds, ok):
+        nonlocal failed
+        latencies.append(seconds)
+        if not ok:
+            failed += 1
+
+    scraper = get_scraper(engine)
+    scraper.on_product_done = on_product_done
+    started = time.perf_counter()
+    scraper.scrape_products(iter_catalog(), collect_results=False)
+    elapsed = time.perf_counter() - started
+    return {
+        'products': len(latencies),
+        'failed': failed,
+        'seconds': round(elapsed, 3),
+        'products_per_second': round(len(latencies) / elapsed, 2) if elapsed else None,
+        'latency_ms': {
+            'p50': round(1000 * percentile(latencies, 50), 1) if latencies else None,
+            'p95': round(1000 * percentile(latencies, 95), 1) if latencies else None,
+            'max': round(1000 * max(latencies), 1) if latencies else None,
+        },
+        'peak_rss_mb': peak_rss_mb(),
+        # Largest of the pipeline engine's parse processes
+        'children_peak_rss_mb': peak_rss_mb(children=True),
+    }
+
+
+def child_main(args):
+    # Keep the scraper's progress output out of the JSON we hand back
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        result = run_engine(args.child, args.products, args.seed)
+    print(json.dumps(result))
+    return 0
+
+
+def bench_env(port: int, proxies: int):
+    env = {key: value for key, value in os.environ.items() if not key.startswith(('PROXY_', 'DATABASE_URL', 'SCRAPER_CACHE'))}
+    env.update({
+        'PYTHONPATH': os.pathsep.join(filter(None, [REPO_ROOT, os.environ.get('PYTHONPATH')])),
+        # Every "proxy" is the stub; eBay and search volume are reached through it
+        'PROXY_LIST': ','.join(f"bench{i}:bench:127.0.0.1:{port}" for i in range(proxies)),
+        'EBAY_BASE_URL': 'http://ebay.bench',
+        'SEARCH_VOLUME_API': 'http://searchvolume.bench/search_volume',
+        'KEYWORD_SUGGEST_URL': f'http://127.0.0.1:{port}/complete/search',
+        'SCRAPER_CACHE': '0',
+        # Measure the engines, not the per-host rate limit
+        'SCRAPER_HOST_RATE': '0',
+        'SCRAPER_PIPELINE_REPORT_SECONDS': '3600',
+    })
+    return env
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline_path):
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    print(f"Compared with {baseline_path} (commit {baseline.get('commit')}):")
+    for engine, result in results.items():
+        before = baseline.get('results', {}).get(engine)
+        if not before or not before.get('products_per_second') or not result.get('products_per_second'):
+            continue
+        change = 100 * (result['products_per_second'] / before['products_per_second'] - 1)
+        p95_before, p95_now = before['latency_ms']['p95'], result['latency_ms']['p95']
+        print(
+            f"{engine:>9}  {before['products_per_second']:>8.2f} -> {result['products_per_second']:>8.2f} products/s ({change:+.1f}%)"
+            f"  p95 {p95_before} -> {p95_now} ms"
+        )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--products', type=int, default=200, help="synthetic catalog size")
+    parser.add_argument('--engines', default='sync,async,pipeline', help="comma-separated scraper engines to run")
+    parser.add_argument('--latency-ms', type=float, default=50.0, help="stub response latency")
+    parser.add_argument('--jitter-ms', type=float, default=10.0, help="uniform +/- jitter on the latency")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="share of requests answered with 503")
+    parser.add_argument('--ban-rate', type=float, default=0.0, help="share of requests answered with 429")
+    parser.add_argument('--no-results-rate', type=float, default=0.1, help="share of eBay pages with no results")
+    parser.add_argument('--proxies', type=int, default=8, help="size of the proxy pool pointed at the stub")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', action='store_true', help="print machine-readable results")
+    parser.add_argument('--output', help="also write the JSON results to this file")
+    parser.add_argument('--compare', help="JSON output of an earlier run to compare against")
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        return child_main(args)
+
+    from benchmarks.stub_upstream import start_stub
+
+    stub, port, requests_served = start_stub(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate,
+        ban_rate=args.ban_rate,
+        no_results_rate=args.no_results_rate,
+    )
+    workdir = tempfile.mkdtemp(prefix='scraper_bench_')
+    results = {}
+    try:
+        for engine in filter(None, args.engines.split(',')):
+            engine_dir = os.path.join(workdir, engine)
+            os.makedirs(engine_dir)
+            served_before = requests_served.value
+            child = subprocess.run(
+                [sys.executable, '-m', 'benchmarks.scraper_bench', '--child', engine,
+                 '--products', str(args.products), '--seed', str(args.seed)],
+                cwd=engine_dir, env=bench_env(port, args.proxies), capture_output=True, text=True,
+            )
+            if child.returncode != 0:
+                print(f"{engine} run failed:\n{child.stderr}", file=sys.stderr)
+                return 1
+            result = json.loads(child.stdout.strip().splitlines()[-1])
+            result['upstream_requests'] = requests_served.value - served_before
+            results[engine] = result
+    finally:
+        stub.terminate()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        'commit': git_commit(),
+        'config': {key: value for key, value in vars(args).items() if key not in ('json', 'output', 'compare', 'child')},
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        for engine, result in results.items():
+            print(
+                f"{engine:>9}  {result['products_per_second']:>8.2f} products/s"
+                f"  p50 {result['latency_ms']['p50']} ms  p95 {result['latency_ms']['p95']} ms"
+                f"  peak RSS {result['peak_rss_mb']} MB  {result['upstream_requests']} requests"
+                f"  {result['failed']} failed"
+            )
+    if args.compare:
+        compare(results, args.compare)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
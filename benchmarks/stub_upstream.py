@@ -0,0 +1,132 @@
+"""Local stand-in for eBay, the search volume API and Google suggest.
+
+Serves recorded responses from ``fixtures/`` with injected latency and
+errors. It also answers proxy-style requests (absolute URLs in the request
+line), so the scraper can be pointed at it through its normal proxy pool:
+eBay and search volume requests go "through" the stub as a proxy, keyword
+suggestions hit it directly.
+
+Run standalone with ``python -m benchmarks.stub_upstream --port 8765``, or
+start it from a benchmark with ``start_stub()``.
+"""
+import argparse
+import hashlib
+import json
+import multiprocessing
+import os
+import random
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+
+def _read_fixture(name):
+    with open(os.path.join(FIXTURES_DIR, name), 'rb') as f:
+        return f.read()
+
+
+def fake_search_volume(keyword: str) -> int:
+    # Stable per keyword, so repeated runs see the same data
+    return int(hashlib.sha256(keyword.encode()).hexdigest()[:6], 16) % 100000
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive, like the real upstreams
+    config = None  # set by make_server
+    counters = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body=b'', content_type='text/plain'):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        config = self.config
+        with self.counters.get_lock():
+            self.counters.value += 1
+        latency = config['latency_ms'] + random.uniform(-config['jitter_ms'], config['jitter_ms'])
+        time.sleep(max(0.0, latency) / 1000)
+
+        roll = random.random()
+        if roll < config['ban_rate']:
+            return self._send(429, b'Too Many Requests')
+        if roll < config['ban_rate'] + config['error_rate']:
+            return self._send(503, b'Service Unavailable')
+
+        # Proxied requests carry the full URL, direct ones only the path
+        url = urlsplit(self.path)
+        query = parse_qs(url.query)
+        if url.path.endswith('/sch/i.html'):
+            body = config['no_results_page'] if random.random() < config['no_results_rate'] else config['results_page']
+            return self._send(200, body, 'text/html; charset=utf-8')
+        if url.path.endswith('/search_volume'):
+            keywords = query.get('keywords', [''])[0].split(',')
+            body = json.dumps({keyword: fake_search_volume(keyword) for keyword in keywords if keyword})
+            return self._send(200, body.encode(), 'application/json')
+        if url.path.endswith('/complete/search'):
+            return self._send(200, config['suggest_xml'], 'text/xml; charset=utf-8')
+        return self._send(404, b'Not Found')
+
+
+def make_server(port=0, latency_ms=50.0, jitter_ms=10.0, error_rate=0.0, ban_rate=0.0, no_results_rate=0.1, counters=None):
+    config = {
+        'latency_ms': latency_ms,
+        'jitter_ms': jitter_ms,
+        'error_rate': error_rate,
+        'ban_rate': ban_rate,
+        'no_results_rate': no_results_rate,
+        'results_page': _read_fixture('ebay_sold_results.html'),
+        'no_results_page': _read_fixture('ebay_no_results.html'),
+        'suggest_xml': _read_fixture('google_suggest.xml'),
+    }
+    handler = type('ConfiguredStubHandler', (StubHandler,), {
+        'config': config,
+        'counters': counters if counters is not None else multiprocessing.Value('L', 0),
+    })
+    server = ThreadingHTTPServer(('127.0.0.1', port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def _serve(ready, counters, options):
+    server = make_server(counters=counters, **options)
+    ready.send(server.server_address[1])
+    server.serve_forever()
+
+
+def start_stub(**options):
+    """Run the stub in its own process, so it doesn't compete for the scraper's GIL.
+
+    Returns (process, port, request_counter).
+    """
+    context = multiprocessing.get_context('spawn')
+    counters = context.Value('L', 0)
+    ready, child_end = context.Pipe(duplex=False)
+    process = context.Process(target=_serve, args=(child_end, counters, options), daemon=True)
+    process.start()
+    port = ready.recv()
+    return process, port, counters
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency-ms', type=float, default=50.0)
+    parser.add_argument('--jitter-ms', type=float, default=10.0)
+    parser.add_argument('--error-rate', type=float, default=0.0, help="share of requests answered with 503")
+    parser.add_argument('--ban-rate', type=float, default=0.0, help="share of requests answered with 429")
+    args = parser.parse_args(argv)
+    server = make_server(args.port, args.latency_ms, args.jitter_ms, args.error_rate, args.ban_rate)
+    print(f"Stub upstream listening on http://127.0.0.1:{server.server_address[1]}")
+    server.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
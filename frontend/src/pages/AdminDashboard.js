@@ -160,9 +160,10 @@ const AdminDashboard = () => {
 
   const handleScrapeProducts = async () => {
     const response = await scrapeProducts();
+    // Queued or already running, the API answers with the job it attached to
     alert(
-      response.message === 'Scraper started in the background'
-        ? 'Scraper started successfully'
+      response.success && response.data?.job_id
+        ? response.data.message
         : 'Error starting scraper'
     );
   };
@@ -1,22 +1,31 @@
-from fastapi import FastAPI, Depends, HTTPException, BackgroundTasks, Body, Request, Response
+from fastapi import FastAPI, Depends, HTTPException, Body, Query, Request, Response
+from fastapi.encoders import jsonable_encoder
 from fastapi.middleware.cors import CORSMiddleware
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from backend.database import SessionLocal, init_db
+from backend.database import AsyncSessionLocal, SessionLocal, async_engine, init_db
 from pydantic import BaseModel
-from backend import crud, models
+from backend import async_crud, crud, models
+from backend.services.metrics import HTTP_REQUEST_SECONDS, render_metrics
+from backend.services.password_hashing import PasswordHashingBusy, get_password_hasher
+from backend.services.price_history import HISTORY_BUCKETS, product_history
+from backend.services.product_documents import document_list
+from backend.services.read_cache import get_read_cache
+from backend.services.scraper import SCRAPER_ENGINES
 from fastapi.security import HTTPBasic, HTTPBasicCredentials
-from typing import Dict, Optional, List
-from backend.services.scraper import run_scraper
+from typing import Dict, Optional, List, Union
 from fastapi.responses import JSONResponse
 from sqlalchemy import create_engine 
 from sqlalchemy.ext.declarative import declarative_base
+import asyncio
+import base64
 import json
-from passlib.context import CryptContext
 import stripe
 import os
 import httpx
 import datetime
 import logging
+import time
 from fastapi.exception_handlers import RequestValidationError
 from fastapi.exceptions import HTTPException as FastAPIHTTPException
 
@@ -57,8 +66,29 @@ app.add_middleware(
     allow_credentials=True,  # Changed to True since we're using credentials
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Next-Cursor"],
 )
 
+@app.middleware("http")
+async def record_request_latency(request: Request, call_next):
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        # Label by route template, not the raw path, so IDs don't explode the label set
+        route = request.scope.get("route")
+        HTTP_REQUEST_SECONDS.labels(
+            request.method, route.path if route else "unmatched", str(status)
+        ).observe(time.perf_counter() - started)
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
 # Startup event to properly initialize the database
 @app.on_event("startup")
 async def startup_event():
@@ -69,6 +99,12 @@ async def startup_event():
         logger.error(f"Error initializing database: {e}")
         # Don't raise exception here to prevent app from crashing
 
+# Close the async pool's connections while the event loop is still running
+@app.on_event("shutdown")
+async def shutdown_event():
+    await async_engine.dispose()
+    password_hasher.shutdown()
+
 # Dependency to get the database session
 def get_db():
     db = SessionLocal()
@@ -77,8 +113,61 @@ def get_db():
     finally:
         db.close()
 
+# Session for the async def routes, so their queries don't hold a threadpool thread
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
 security = HTTPBasic()
 
+read_cache = get_read_cache()
+
+password_hasher = get_password_hasher()
+
+class RawJSONResponse(Response):
+    """JSON that is already encoded (product documents, cached bodies), sent as-is."""
+    media_type = "application/json"
+
+def encode_cursor(values) -> str:
+    return base64.urlsafe_b64encode(json.dumps(list(values)).encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str, size: int):
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except ValueError:
+        values = None
+    if not isinstance(values, list) or len(values) != size:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return tuple(values)
+
+async def cached_json(request: Request, db: AsyncSession, key, load, with_headers: bool = False):
+    """JSON response for the coroutine load(), served from the read cache while the catalog is unchanged.
+
+    The ETag is the catalog version, so a client that sends it back in
+    If-None-Match gets a 304 until the next product write. load may return
+    already-encoded bytes. With with_headers, load returns (payload, headers)
+    and the headers are cached along with the body.
+    """
+    version = await read_cache.version(db)
+    headers = {"ETag": f'W/"catalog-{version}"', "Cache-Control": "no-cache"}
+    if_none_match = request.headers.get("if-none-match", "")
+    if headers["ETag"] in (tag.strip() for tag in if_none_match.split(",")) or if_none_match.strip() == "*":
+        return Response(status_code=304, headers=headers)
+    cached = read_cache.get(key, version)
+    if cached is None:
+        payload, extra_headers = await load() if with_headers else (await load(), {})
+        if isinstance(payload, bytes):
+            body = payload
+        else:
+            # Same encoding as FastAPI's JSONResponse
+            body = json.dumps(
+                jsonable_encoder(payload), ensure_ascii=False, allow_nan=False, separators=(",", ":")
+            ).encode("utf-8")
+        cached = (body, extra_headers)
+        read_cache.set(key, version, cached)
+    body, extra_headers = cached
+    return RawJSONResponse(content=body, headers={**headers, **extra_headers})
+
 def verify_password(credentials: HTTPBasicCredentials):
     correct_username = os.environ.get("ADMIN_USERNAME")
     correct_password = os.environ.get("ADMIN_PASSWORD")
@@ -95,13 +184,21 @@ class ProductResponse(BaseModel):
     name: str
     image_url: str
     average_ebay_price: Optional[float] = None
+    ebay_price_median: Optional[float] = None
+    ebay_price_trimmed_mean: Optional[float] = None
+    ebay_price_p10: Optional[float] = None
+    ebay_price_p25: Optional[float] = None
+    ebay_price_p75: Optional[float] = None
+    ebay_price_p90: Optional[float] = None
+    ebay_price_count: Optional[int] = None
+    ebay_price_outliers: Optional[int] = None
     ebay_listings: Optional[int] = None
     ebay_sale_amount: Optional[float] = None
     search_volume_us: Optional[str] = None
     search_volume_au: Optional[str] = None
     search_volume_uk: Optional[str] = None
     popular_keywords: Optional[List[str]] = None
-    vendor: Optional[List[Dict]] = None 
+    vendor: Optional[Union[List[Dict], Dict]] = None 
     last_updated: Optional[str] = None
     
 class FeeCalculator:
@@ -167,12 +264,19 @@ class UserCreate(BaseModel):
     username: str
     password: str
 
-# Password hashing context
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# bcrypt runs in the hashing pool; when its queue is full, fail fast instead of piling up
+@app.exception_handler(PasswordHashingBusy)
+async def password_hashing_busy_handler(request: Request, exc: PasswordHashingBusy):
+    logger.warning(f"Rejected {request.url.path}: {exc}")
+    return JSONResponse(
+        status_code=503,
+        content={"message": "Too many login attempts in progress, please retry shortly", "code": 503},
+        headers={"Retry-After": "1"},
+    )
 
 @app.post("/register")
-def register_user(user: UserCreate, db: Session = Depends(get_db)):
-    existing_user = crud.get_user_by_username(db, username=user.username)
+async def register_user(user: UserCreate, db: AsyncSession = Depends(get_async_db)):
+    existing_user = await async_crud.get_user_by_username(db, username=user.username)
     if existing_user:
         raise HTTPException(status_code=400, detail="Username already registered")
 
@@ -180,18 +284,22 @@ def register_user(user: UserCreate, db: Session = Depends(get_db)):
     if len(user.password) < 8:
         raise HTTPException(status_code=400, detail="Password must be at least 8 characters long")
 
-    hashed_password = pwd_context.hash(user.password)
-    new_user = crud.create_user(db, username=user.username, hashed_password=hashed_password)
+    hashed_password = await password_hasher.hash(user.password)
+    new_user = await async_crud.create_user(db, username=user.username, hashed_password=hashed_password)
     return {"message": "User registered successfully"}
 
 @app.post("/login")
-def login(login_request: LoginRequest, db: Session = Depends(get_db)):
-    user = crud.get_user_by_username(db, username=login_request.username)
+async def login(login_request: LoginRequest, db: AsyncSession = Depends(get_async_db)):
+    user = await async_crud.get_user_by_username(db, username=login_request.username)
     if not user:
         raise HTTPException(status_code=401, detail="Invalid credentials")
 
-    if not pwd_context.verify(login_request.password, user.hashed_password):
+    valid, new_hash = await password_hasher.verify_and_update(login_request.password, user.hashed_password)
+    if not valid:
         raise HTTPException(status_code=401, detail="Invalid credentials")
+    if new_hash:
+        # Stored with other bcrypt settings than PASSWORD_BCRYPT_ROUNDS; upgrade it now we have the password
+        await async_crud.update_user_password_hash(db, user.id, new_hash)
 
     # Return the user's plan in the response
     return {"success": True, "message": "Login successful", "plan": user.plan or "free"}
@@ -225,80 +333,208 @@ def delete_product(product_id: int, db: Session = Depends(get_db), credentials:
         raise HTTPException(status_code=404, detail="Product not found")
     return product
 
-@app.get("/products/")
-def read_products(skip: int = 0, limit: int = 15, db: Session = Depends(get_db)):
+@app.get("/products/", response_model=List[ProductResponse], response_class=RawJSONResponse)
+async def read_products(
+    request: Request,
+    skip: int = 0,
+    limit: int = Query(15, ge=1, le=100),
+    sort: str = "id",
+    order: str = Query("asc", pattern="^(asc|desc)$"),
+    cursor: Optional[str] = None,
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    min_listings: Optional[int] = None,
+    max_listings: Optional[int] = None,
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Products ordered by sort (see crud.PRODUCT_SORT_KEYS), with the next page's cursor in X-Next-Cursor."""
+    if sort not in crud.PRODUCT_SORT_KEYS:
+        raise HTTPException(status_code=400, detail=f"sort must be one of: {', '.join(crud.PRODUCT_SORT_KEYS)}")
+    after = None
+    if cursor:
+        cursor_sort, cursor_order, *after = decode_cursor(cursor, 4)
+        if (cursor_sort, cursor_order) != (sort, order):
+            raise HTTPException(status_code=400, detail="Cursor was issued for a different sort")
+    filters = {"min_price": min_price, "max_price": max_price, "min_listings": min_listings, "max_listings": max_listings}
+
+    async def load():
+        products, last = await async_crud.list_products(
+            db, sort=sort, descending=order == "desc", limit=limit, after=after, skip=skip, **filters
+        )
+        documents = await async_crud.get_product_documents(db, products)
+        body = document_list(documents[product.id] for product in products)
+        return body, ({"X-Next-Cursor": encode_cursor([sort, order, *last])} if last else {})
+
     try:
-        return crud.get_products(db, skip=skip, limit=limit)
+        key = ("products", skip, limit, sort, order, cursor, *filters.values())
+        return await cached_json(request, db, key, load, with_headers=True)
+    except HTTPException as e:
+        raise e
     except Exception as e:
         logger.error(f"Error retrieving products: {e}")
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
 
-@app.get("/products/{product_id}", response_model=ProductResponse)
-def read_product(product_id: int, db: Session = Depends(get_db)):
+@app.get("/products/{product_id}", response_model=ProductResponse, response_class=RawJSONResponse)
+async def read_product(product_id: int, request: Request, db: AsyncSession = Depends(get_async_db)):
     try:
-        product = crud.get_product(db, product_id=product_id)
-        if product is None:
-            raise HTTPException(status_code=404, detail="Product not found")
-        
-        # Handle popular_keywords safely
-        try:
-            keywords = json.loads(product.popular_keywords) if isinstance(product.popular_keywords, str) else product.popular_keywords or []
-        except (json.JSONDecodeError, TypeError):
-            keywords = []
-
-        # Convert SQLAlchemy object to dictionary with safe defaults
-        product_dict = {
-            "id": product.id,
-            "name": product.name,
-            "image_url": product.image_url,
-            "average_ebay_price": product.average_ebay_price or 0.0,
-            "ebay_listings": product.ebay_listings or 0,
-            "ebay_sale_amount": product.ebay_sale_amount or 0.0,
-            "search_volume_us": product.search_volume_us or "0",
-            "search_volume_au": product.search_volume_au or "0",
-            "search_volume_uk": product.search_volume_uk or "0",
-            "popular_keywords": keywords,
-            "vendor": product.vendor if product.vendor else None,
-            "last_updated": product.last_updated or None,
-        }
-        return product_dict
+        return await cached_json(request, db, ("product", product_id), lambda: load_product(db, product_id))
+    except HTTPException as e:
+        raise e
     except Exception as e:
         logger.error(f"Error retrieving product {product_id}: {e}")
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
 
-@app.get("/search/")
-def search_products(query: str, db: Session = Depends(get_db)):
+async def load_product(db: AsyncSession, product_id: int):
+    document = await async_crud.get_product_document(db, product_id)
+    if document is None:
+        raise HTTPException(status_code=404, detail="Product not found")
+    return document
+
+def to_utc_naive(moment: Optional[datetime.datetime]):
+    # Timestamps are stored as naive UTC
+    if moment is not None and moment.tzinfo is not None:
+        moment = moment.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+    return moment
+
+@app.get("/products/{product_id}/history")
+def read_product_history(
+    product_id: int,
+    start: Optional[datetime.datetime] = Query(None, alias="from"),
+    end: Optional[datetime.datetime] = Query(None, alias="to"),
+    bucket: Optional[str] = None,
+    db: Session = Depends(get_db),
+):
+    if bucket and bucket not in HISTORY_BUCKETS:
+        raise HTTPException(status_code=400, detail=f"bucket must be one of {', '.join(HISTORY_BUCKETS)}")
+    end = to_utc_naive(end) or datetime.datetime.utcnow()
+    start = to_utc_naive(start) or end - datetime.timedelta(days=30)
+    if start >= end:
+        raise HTTPException(status_code=400, detail="'from' must be before 'to'")
+    if crud.get_product(db, product_id=product_id) is None:
+        raise HTTPException(status_code=404, detail="Product not found")
+    try:
+        return product_history(db, product_id, start, end, bucket)
+    except Exception as e:
+        logger.error(f"Error retrieving history for product {product_id}: {e}")
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+
+@app.get("/search/", response_model=List[ProductResponse], response_class=RawJSONResponse)
+async def search_products(
+    query: str,
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    min_listings: Optional[int] = None,
+    db: AsyncSession = Depends(get_async_db),
+):
+    # The body stays a plain list for the frontend; the next page's cursor is in X-Next-Cursor
+    after = decode_cursor(cursor, 2) if cursor else None
     try:
-        products = db.query(models.Product).filter(models.Product.name.ilike(f"%{query}%")).all()
-        return products
+        products, last = await async_crud.search_products(
+            db, query, limit=limit, after=after, min_price=min_price, max_price=max_price, min_listings=min_listings
+        )
+        documents = await async_crud.get_product_documents(db, products)
+        headers = {"X-Next-Cursor": encode_cursor(last)} if last is not None else None
+        return RawJSONResponse(document_list(documents[product.id] for product in products), headers=headers)
     except Exception as e:
         logger.error(f"Error searching products: {e}")
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
 
+@app.get("/keywords")
+def list_keywords(prefix: str = "", limit: int = 20, db: Session = Depends(get_db)):
+    try:
+        return [
+            {"keyword": keyword, "product_count": product_count}
+            for keyword, product_count in crud.get_keywords_with_prefix(db, prefix, limit)
+        ]
+    except Exception as e:
+        logger.error(f"Error listing keywords: {e}")
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+
+@app.get("/keywords/{keyword}/products")
+def read_keyword_products(keyword: str, skip: int = 0, limit: int = 50, db: Session = Depends(get_db)):
+    try:
+        return crud.get_products_by_keyword(db, keyword, skip=skip, limit=limit)
+    except Exception as e:
+        logger.error(f"Error retrieving products for keyword {keyword}: {e}")
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+
+@app.get("/products/{product_id}/related")
+def read_related_products(product_id: int, limit: int = 10, db: Session = Depends(get_db)):
+    try:
+        return [
+            {"product": product, "shared_keywords": shared_keywords}
+            for product, shared_keywords in crud.get_related_products(db, product_id, limit)
+        ]
+    except Exception as e:
+        logger.error(f"Error retrieving products related to {product_id}: {e}")
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+
+class ScrapeJobResponse(BaseModel):
+    id: int
+    product_id: Optional[int] = None
+    engine: Optional[str] = None
+    status: str
+    attempts: Optional[int] = None
+    worker_id: Optional[str] = None
+    products_done: Optional[int] = None
+    products_total: Optional[int] = None
+    error: Optional[str] = None
+    created_at: Optional[datetime.datetime] = None
+    started_at: Optional[datetime.datetime] = None
+    heartbeat_at: Optional[datetime.datetime] = None
+    finished_at: Optional[datetime.datetime] = None
+
+    class Config:
+        from_attributes = True
+
+def validate_engine(engine: Optional[str]):
+    if engine and engine not in SCRAPER_ENGINES:
+        raise HTTPException(status_code=400, detail=f"Unknown scraper engine: {engine}")
+
+# Scrapes run in the separate worker process (see Procfile), the API only queues them
 @app.post("/products/scrape")
-def scrape_products(background_tasks: BackgroundTasks, credentials: HTTPBasicCredentials = Depends(security)):
+def scrape_products(engine: Optional[str] = None, db: Session = Depends(get_db), credentials: HTTPBasicCredentials = Depends(security)):
     verify_password(credentials)
+    validate_engine(engine)
     try:
-        # Add better error handling for scraper
-        background_tasks.add_task(run_scraper)
-        return {"message": "Scraper started in the background"}
-    except ValueError as ve:
-        logger.error(f"Proxy error: {str(ve)}")
-        raise HTTPException(status_code=500, detail="Scraper configuration error: Check proxy settings")
+        job, created = crud.enqueue_scrape_job(db, engine=engine)
+        if not created:
+            return {"message": f"A full scrape is already {job.status}", "job_id": job.id}
+        return {"message": "Scrape job queued", "job_id": job.id}
     except Exception as e:
-        logger.error(f"Error starting scraper: {e}")
+        logger.error(f"Error queueing scrape job: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/products/scrape/{product_id}")
-def scrape_product(product_id: int, background_tasks: BackgroundTasks, credentials: HTTPBasicCredentials = Depends(security)):
+def scrape_product(product_id: int, engine: Optional[str] = None, db: Session = Depends(get_db), credentials: HTTPBasicCredentials = Depends(security)):
     verify_password(credentials)
+    validate_engine(engine)
+    if crud.get_product(db, product_id=product_id) is None:
+        raise HTTPException(status_code=404, detail="Product not found")
     try:
-        background_tasks.add_task(run_scraper, product_id)  # Run the scraper in the background for a specific product
-        return {"message": f"Scraper started in the background for product ID {product_id}"}
+        job, created = crud.enqueue_scrape_job(db, product_id=product_id, engine=engine)
+        if not created:
+            return {"message": f"Product ID {product_id} is already covered by {job.status} scrape job {job.id}", "job_id": job.id}
+        return {"message": f"Scrape job queued for product ID {product_id}", "job_id": job.id}
     except Exception as e:
-        logger.error(f"Error starting scraper for product {product_id}: {e}")
+        logger.error(f"Error queueing scrape job for product {product_id}: {e}")
         return {"message": f"Error starting scraper: {str(e)}"}
 
+@app.get("/scrape-jobs", response_model=List[ScrapeJobResponse])
+def list_scrape_jobs(limit: int = 20, status: Optional[str] = None, db: Session = Depends(get_db), credentials: HTTPBasicCredentials = Depends(security)):
+    verify_password(credentials)
+    return crud.get_scrape_jobs(db, limit=limit, status=status)
+
+@app.get("/scrape-jobs/{job_id}", response_model=ScrapeJobResponse)
+def get_scrape_job(job_id: int, db: Session = Depends(get_db), credentials: HTTPBasicCredentials = Depends(security)):
+    verify_password(credentials)
+    job = crud.get_scrape_job(db, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Scrape job not found")
+    return job
+
 @app.get("/test/")
 def test_endpoint():
     return {"message": "Server is running"}
@@ -329,7 +565,7 @@ class StripeCheckoutSessionRequest(BaseModel):
     plan: str
 
 @app.post("/create-checkout-session")
-async def create_checkout_session(request: StripeCheckoutSessionRequest, db: Session = Depends(get_db), current_request: Request = None):
+async def create_checkout_session(request: StripeCheckoutSessionRequest, current_request: Request = None):
     if not stripe.api_key:
         raise HTTPException(status_code=500, detail="Stripe API key not configured")
     
@@ -366,7 +602,9 @@ async def create_checkout_session(request: StripeCheckoutSessionRequest, db: Ses
     base_url = os.environ.get("APP_BASE_URL", "https://flipvault.netlify.app").rstrip('/')
 
     try:
-        checkout_session = stripe.checkout.Session.create(
+        # The Stripe client is blocking; keep it off the event loop
+        checkout_session = await asyncio.to_thread(
+            stripe.checkout.Session.create,
             payment_method_types=['card'],
             line_items=[{'price': price_id, 'quantity': 1}],
             mode=mode,
@@ -429,8 +667,8 @@ def delete_user(user_id: int, db: Session = Depends(get_db), credentials: HTTPBa
     return {"message": "User deleted successfully"}
 
 @app.get("/user/plan/{username}")
-def get_user_plan(username: str, db: Session = Depends(get_db)):
-    user = crud.get_user_by_username(db, username)
+async def get_user_plan(username: str, db: AsyncSession = Depends(get_async_db)):
+    user = await async_crud.get_user_by_username(db, username)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     return {
@@ -443,7 +681,7 @@ def get_user_plan(username: str, db: Session = Depends(get_db)):
 from fastapi import Header
 
 @app.post("/webhook")
-async def stripe_webhook(request: Request, stripe_signature: str = Header(None), db: Session = Depends(get_db)):
+async def stripe_webhook(request: Request, stripe_signature: str = Header(None), db: AsyncSession = Depends(get_async_db)):
     payload = await request.body()
     endpoint_secret = os.environ.get("STRIPE_WEBHOOK_SECRET")
     try:
@@ -464,7 +702,7 @@ async def stripe_webhook(request: Request, stripe_signature: str = Header(None),
         subscription_id = session.get("subscription")
 
         # Fetch line items to get price ID (new API)
-        line_items = stripe.checkout.Session.list_line_items(session["id"])
+        line_items = await asyncio.to_thread(stripe.checkout.Session.list_line_items, session["id"])
         price_id = line_items.data[0].price.id if line_items.data else None
 
         if not plan and price_id:
@@ -476,7 +714,7 @@ async def stripe_webhook(request: Request, stripe_signature: str = Header(None),
             plan = price_ids.get(price_id)
 
         if username and plan:
-            user = crud.get_user_by_username(db, username)
+            user = await async_crud.get_user_by_username(db, username)
             if user:
                 now = datetime.datetime.utcnow()
                 if plan == "pro-lite":
@@ -488,8 +726,7 @@ async def stripe_webhook(request: Request, stripe_signature: str = Header(None),
                 else:
                     end = None
 
-                crud.update_user_subscription(db, user_id=user.id, plan=plan, start=now, end=end, stripe_subscription_id=subscription_id)
-                db.commit()
+                await async_crud.update_user_subscription(db, user_id=user.id, plan=plan, start=now, end=end, stripe_subscription_id=subscription_id)
                 logger.info(f"Updated user {username} to plan {plan} with subscription {subscription_id}")
             else:
                 logger.warning(f"User {username} not found")
@@ -534,13 +771,12 @@ def cancel_subscription(request: CancelSubscriptionRequest, db: Session = Depend
         raise HTTPException(status_code=500, detail="Failed to cancel subscription")
 
 @app.get("/products-last-scraped")
-def get_latest_scraped_date(db: Session = Depends(get_db)):
+async def get_latest_scraped_date(request: Request, db: AsyncSession = Depends(get_async_db)):
+    async def load():
+        return {"lastScraped": await async_crud.get_latest_last_updated(db) or None}  # No isoformat() needed
+
     try:
-        latest = db.query(models.Product.last_updated).order_by(models.Product.last_updated.desc()).first()
-        if not latest or not latest.last_updated:
-            return {"lastScraped": None}
-        
-        return {"lastScraped": latest.last_updated}  # No isoformat() needed
+        return await cached_json(request, db, ("last_scraped",), load)
     except Exception as e:
         logger.error(f"Error fetching latest last_updated: {e}")
         raise HTTPException(status_code=500, detail="Database error")
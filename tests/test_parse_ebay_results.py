@@ -0,0 +1,30 @@
+"""Golden-fixture test for the eBay parser backends.
+
+Every backend must reproduce ``benchmarks/fixtures/<name>.expected.json``
+exactly for each ``benchmarks/fixtures/<name>.html``, so switching
+SCRAPER_PARSER never changes what gets stored.
+"""
+import pytest
+
+from backend.services.ebay_parsers import PARSER_BACKENDS
+from benchmarks.parser_bench import load_fixtures
+
+FIXTURES = load_fixtures()
+FIXTURE_IDS = [name for name, _, _ in FIXTURES]
+
+
+def test_fixtures_found():
+    assert FIXTURES, "no ebay_*.html fixtures in benchmarks/fixtures"
+
+
+@pytest.mark.parametrize('backend', sorted(PARSER_BACKENDS))
+@pytest.mark.parametrize('name, html_content, expected', FIXTURES, ids=FIXTURE_IDS)
+def test_matches_golden_output(backend, name, html_content, expected):
+    assert tuple(PARSER_BACKENDS[backend](html_content)) == expected
+
+
+@pytest.mark.parametrize('name, html_content, expected', FIXTURES, ids=FIXTURE_IDS)
+def test_backends_agree(name, html_content, expected):
+    (first, result), *others = ((backend, tuple(parse(html_content))) for backend, parse in PARSER_BACKENDS.items())
+    for backend, other in others:
+        assert other == result, f"{backend} and {first} disagree on {name}"